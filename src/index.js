@@ -571,6 +571,9 @@ app.on('will-quit', async (event) => {
   // Stop all scheduled recordings and clean up resources
   await recordingScheduler.shutdown();
   
+  // Stop the recommendation worker process
+  recommendationEngine.stopPythonWorker();
+  
   // Stop any active playback
   await playerEngine.stopPlayback();
   
@@ -1173,7 +1176,7 @@ ipcMain.on('get-recommendations', async (event, { currentChannelId }) => {
     const allChannels = await playerEngine.getChannels();
     
     // Get recommendations
-    const recommendations = recommendationEngine.getRecommendations(allChannels, currentChannelId);
+    const recommendations = await recommendationEngine.getRecommendations(allChannels, currentChannelId);
     event.reply('recommendations', recommendations);
   } catch (error) {
     event.reply('error', { component: 'recommendations', message: error.message });
@@ -6,6 +6,7 @@
  */
 
 const { spawn, execSync } = require('child_process');
+const readline = require('readline');
 const log = require('electron-log');
 const path = require('path');
 const fs = require('fs');
@@ -15,6 +16,141 @@ const os = require('os');
 log.transports.file.level = 'info';
 log.transports.console.level = 'info';
 
+/**
+ * Log the diagnostics block of a script result, if it carries one
+ * @param {string} scriptName - Script the result came from
+ * @param {Object} result - Parsed result
+ */
+function logDiagnostics(scriptName, result) {
+  if (result && result.diagnostics) {
+    log.info(`[PythonWrapper] ${scriptName} diagnostics: ${JSON.stringify(result.diagnostics)}`);
+  }
+}
+
+/**
+ * Long-lived Python process speaking newline-delimited JSON on stdin/stdout.
+ * Every request gets an `id`; the matching response line resolves its promise.
+ */
+class PythonWorker {
+  constructor(command, scriptPath, args = []) {
+    this.scriptName = path.basename(scriptPath);
+    this.nextId = 1;
+    this.pending = new Map();
+    this.alive = true;
+    this.stderrData = '';
+
+    this.process = spawn(command, [scriptPath, ...args]);
+
+    const lines = readline.createInterface({ input: this.process.stdout });
+    lines.on('line', (line) => this.handleLine(line));
+
+    this.process.stderr.on('data', (data) => {
+      // Keep only the tail so a chatty worker cannot grow this forever
+      this.stderrData = (this.stderrData + data.toString()).slice(-4096);
+    });
+
+    this.process.on('close', (code) => {
+      this.alive = false;
+      this.rejectAll(new Error(`Python worker exited with code ${code}: ${this.stderrData}`));
+    });
+
+    this.process.on('error', (error) => {
+      this.alive = false;
+      this.rejectAll(error);
+    });
+
+    // Writes racing a crashed worker surface as EPIPE; 'close' handles cleanup
+    this.process.stdin.on('error', (error) => {
+      log.warn(`[PythonWrapper] Worker stdin error: ${error.message}`);
+    });
+  }
+
+  /**
+   * Handle one response line from the worker
+   * @param {string} line - Raw JSON line
+   */
+  handleLine(line) {
+    let response;
+    try {
+      response = JSON.parse(line);
+    } catch (error) {
+      log.warn(`[PythonWrapper] Ignoring malformed worker output: ${line.slice(0, 200)}`);
+      return;
+    }
+
+    const entry = this.pending.get(response.id);
+    if (!entry) {
+      return;
+    }
+
+    this.pending.delete(response.id);
+    clearTimeout(entry.timer);
+
+    if (response.ok === false) {
+      entry.reject(new Error(response.error || 'Python worker request failed'));
+    } else {
+      logDiagnostics(this.scriptName, response);
+      entry.resolve(response);
+    }
+  }
+
+  /**
+   * Send a request to the worker
+   * @param {Object} message - Request with a `type` field
+   * @param {number} timeoutMs - Time to wait for the response
+   * @returns {Promise<Object>} - Parsed response
+   */
+  request(message, timeoutMs = 10000) {
+    if (!this.alive) {
+      return Promise.reject(new Error('Python worker is not running'));
+    }
+
+    const id = this.nextId++;
+
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Python worker request '${message.type}' timed out after ${timeoutMs}ms`));
+      }, timeoutMs);
+
+      this.pending.set(id, { resolve, reject, timer });
+      this.process.stdin.write(JSON.stringify({ ...message, id }) + '\n');
+    });
+  }
+
+  /**
+   * Reject every request that is still waiting for a response
+   * @param {Error} error - Reason
+   */
+  rejectAll(error) {
+    for (const entry of this.pending.values()) {
+      clearTimeout(entry.timer);
+      entry.reject(error);
+    }
+    this.pending.clear();
+  }
+
+  /**
+   * Check if the worker process is still running
+   * @returns {boolean} - True if alive
+   */
+  isAlive() {
+    return this.alive;
+  }
+
+  /**
+   * Ask the worker to exit and close its input
+   */
+  stop() {
+    if (!this.alive) {
+      return;
+    }
+
+    this.request({ type: 'shutdown' }, 2000).catch(() => {});
+    this.process.stdin.end();
+  }
+}
+
 class PythonWrapper {
   constructor() {
     this.pythonAvailable = false;
@@ -62,7 +198,8 @@ class PythonWrapper {
    * Run a Python script with arguments
    * @param {string} scriptPath - Path to the Python script
    * @param {Array<string>} args - Arguments to pass to the script
-   * @param {Object} options - Options for execution
+   * @param {Object} options - Options for execution; `diagnostics: true` passes
+   *   --diagnostics to the script and logs the block from its JSON output
    * @returns {Promise<string>} - Script output
    */
   async runScript(scriptPath, args = [], options = {}) {
@@ -82,6 +219,10 @@ class PythonWrapper {
       throw new Error('Python is not available on this system');
     }
 
+    if (options.diagnostics) {
+      args = [...args, '--diagnostics'];
+    }
+
     return new Promise((resolve, reject) => {
       const python = spawn(this.pythonCommand, [scriptPath, ...args]);
       
@@ -98,6 +239,13 @@ class PythonWrapper {
 
       python.on('close', (code) => {
         if (code === 0) {
+          if (options.diagnostics) {
+            try {
+              logDiagnostics(path.basename(scriptPath), JSON.parse(stdoutData));
+            } catch (error) {
+              log.warn(`[PythonWrapper] Could not read diagnostics: ${error.message}`);
+            }
+          }
           resolve(stdoutData.trim());
         } else {
           const error = new Error(`Python script exited with code ${code}: ${stderrData}`);
@@ -124,6 +272,21 @@ class PythonWrapper {
     });
   }
 
+  /**
+   * Start a long-lived Python worker process
+   * @param {string} scriptPath - Path to the Python script
+   * @param {Array<string>} args - Arguments to pass to the script
+   * @returns {PythonWorker} - Worker handle
+   */
+  startWorker(scriptPath, args = []) {
+    if (!this.pythonAvailable) {
+      throw new Error('Python is not available on this system');
+    }
+
+    log.info(`[PythonWrapper] Starting Python worker: ${path.basename(scriptPath)}`);
+    return new PythonWorker(this.pythonCommand, scriptPath, args);
+  }
+
   /**
    * Get OS-specific help for installing Python
    * @returns {string} - Help message
@@ -160,3 +323,4 @@ class PythonWrapper {
 
 // Export singleton instance
 module.exports = new PythonWrapper();
+module.exports.PythonWorker = PythonWorker;
@@ -8,6 +8,7 @@
 
 const fs = require('fs');
 const path = require('path');
+const crypto = require('crypto');
 const { promisify } = require('util');
 const log = require('electron-log');
 const pathManager = require('./path-manager');
@@ -22,6 +23,10 @@ log.transports.console.level = 'info';
 const DATA_DIR = pathManager.getDataDir();
 const LOGS_DIR = pathManager.getLogsDir();
 const HISTORY_FILE = path.join(DATA_DIR, 'viewing-history.json');
+const PROFILE_FILE = path.join(DATA_DIR, 'recommendation-profile.json'); // Incremental profile snapshot
+const PROFILE_LOG = `${PROFILE_FILE}.log`; // View events not yet folded into the snapshot
+const RESULT_CACHE_DIR = path.join(DATA_DIR, 'recommendation-cache'); // On-disk tier of the Python result cache
+const CATALOG_FILE = path.join(DATA_DIR, 'recommendation-catalog.bin'); // Binary channel catalog for one-shot runs
 const RECOMMENDATIONS_LOG = path.join(LOGS_DIR, 'recommendations.log');
 
 // Default settings
@@ -33,8 +38,10 @@ const DEFAULT_SETTINGS = {
   recommendationFactors: {
     genre: 0.5,    // Weight for genre/category similarity
     viewTime: 0.3, // Weight for total view time
-    recency: 0.2   // Weight for how recent the views were
+    recency: 0.2,  // Weight for how recent the views were
+    content: 0.2   // Weight for name/group/language similarity (Python scorer only)
   },
+  diagnostics: false, // Log per-phase timings and memory from the Python scorer
   useFallbackMode: false // Set to true when Python is not available
 };
 
@@ -48,6 +55,11 @@ class RecommendationEngine {
     this.channelMetadata = new Map(); // Stores additional metadata about channels
     this.similarityCache = new Map(); // Cache similarity calculations
     this.fallbackMode = false; // Will be set to true if Python is not available
+    this.pythonWorker = null; // Long-lived Python scoring process
+    this.workerChannels = null; // Channel list last sent to the worker
+    this.channelLookup = { channels: null, byId: new Map() }; // id -> channel for rehydration
+    this.catalogState = { channels: null, checksum: null, written: null }; // Checksum of the binary catalog
+    this.workerHistoryDirty = true; // History changed since last sent to the worker
     
     // Load history and settings
     this.loadSettings();
@@ -144,6 +156,7 @@ class RecommendationEngine {
       }
       
       fs.writeFileSync(HISTORY_FILE, JSON.stringify(this.viewingHistory, null, 2), 'utf8');
+      this.workerHistoryDirty = true;
       this.logInfo(`Saved ${this.viewingHistory.length} viewing history entries`);
       return true;
     } catch (error) {
@@ -208,9 +221,34 @@ class RecommendationEngine {
     }
     
     this.saveHistory();
+    this.appendProfileEvent(channel, duration);
     return true;
   }
   
+  /**
+   * Append a raw view event to the profile delta log for the Python scorer
+   * @param {Object} channel - Channel object
+   * @param {number} duration - Viewing duration in seconds
+   */
+  appendProfileEvent(channel, duration) {
+    // Until the first snapshot exists, the full history is sent instead
+    if (!fs.existsSync(PROFILE_FILE)) {
+      return;
+    }
+    
+    try {
+      const event = {
+        channelId: channel.id,
+        channelGroup: channel.group || '',
+        viewTimeSeconds: duration,
+        timestamp: Date.now()
+      };
+      fs.appendFileSync(PROFILE_LOG, JSON.stringify(event) + '\n', 'utf8');
+    } catch (error) {
+      this.logError(`Error appending to profile log: ${error.message}`);
+    }
+  }
+  
   /**
    * Get recommendations based on viewing history
    * @param {Array} availableChannels - All available channels
@@ -253,16 +291,33 @@ class RecommendationEngine {
     
     // First check if we can use Python
     if (pythonWrapper.isPythonAvailable() && !this.settings.useFallbackMode) {
+      // Prefer the long-lived worker, which keeps the catalog in memory
+      try {
+        const recommendations = await this.getWorkerRecommendations(availableChannels, currentChannelId);
+        this.logInfo(`Retrieved ${recommendations.length} recommendations from Python worker`);
+        return recommendations;
+      } catch (error) {
+        this.logWarning(`Python worker unavailable, running one-shot script: ${error.message}`);
+        this.stopPythonWorker();
+      }
+
       try {
         // Create temp data file for Python to use
         const tempDataFile = path.join(DATA_DIR, 'recommendation-data.json');
+        const catalogChecksum = this.getCatalogChecksum(availableChannels);
         const tempData = {
-          history: this.viewingHistory,
-          channels: availableChannels,
+          // With a profile snapshot, history only seeds the first run
+          history: fs.existsSync(PROFILE_FILE) ? [] : this.viewingHistory,
           currentChannel: currentChannelId,
-          settings: this.settings
+          settings: this.settings,
+          catalogChecksum
         };
         
+        // Channels only travel when the binary catalog has to be (re)written
+        if (this.catalogState.written !== catalogChecksum || !fs.existsSync(CATALOG_FILE)) {
+          tempData.channels = availableChannels;
+        }
+        
         // Write data to temp file
         fs.writeFileSync(tempDataFile, JSON.stringify(tempData, null, 2), 'utf8');
         
@@ -278,10 +333,16 @@ class RecommendationEngine {
         // Run Python script with fallback option
         const result = await pythonWrapper.runScript(
           scriptPath,
-          [tempDataFile],
+          [
+            tempDataFile, '--output', 'ids', '--profile', PROFILE_FILE,
+            '--cache-dir', RESULT_CACHE_DIR, '--catalog', CATALOG_FILE
+          ],
           {
+            diagnostics: this.settings.diagnostics,
             fallback: () => {
               this.logInfo('Python script failed, using fallback recommendations');
+              // The catalog may be missing or stale; resend the channels next time
+              this.catalogState.written = null;
               return this.getFallbackRecommendations(availableChannels, currentChannelId);
             }
           }
@@ -296,8 +357,9 @@ class RecommendationEngine {
           }
           
           if (Array.isArray(pythonResult.recommendations)) {
+            this.catalogState.written = catalogChecksum;
             this.logInfo(`Retrieved ${pythonResult.recommendations.length} recommendations from Python`);
-            return pythonResult.recommendations;
+            return this.rehydrateRecommendations(pythonResult.recommendations, availableChannels);
           }
         } catch (parseError) {
           this.logError(`Error parsing Python result: ${parseError.message}`);
@@ -313,6 +375,106 @@ class RecommendationEngine {
     return this.getFallbackRecommendations(availableChannels, currentChannelId);
   }
   
+  /**
+   * Checksum of the channel list, recomputed only when the list itself changes
+   * @param {Array} availableChannels - All available channels
+   * @returns {string} Hex checksum identifying the binary catalog contents
+   */
+  getCatalogChecksum(availableChannels) {
+    if (this.catalogState.channels !== availableChannels) {
+      this.catalogState.channels = availableChannels;
+      this.catalogState.checksum = crypto
+        .createHash('sha1')
+        .update(JSON.stringify(availableChannels))
+        .digest('hex');
+    }
+    return this.catalogState.checksum;
+  }
+  
+  /**
+   * Get recommendations from the long-lived Python worker, sending only what changed
+   * @param {Array} availableChannels - All available channels
+   * @param {string} currentChannelId - Currently viewed channel ID
+   * @returns {Promise<Array>} Recommended channels
+   */
+  async getWorkerRecommendations(availableChannels, currentChannelId) {
+    if (!this.pythonWorker || !this.pythonWorker.isAlive()) {
+      const scriptPath = path.join(__dirname, 'scripts', 'recommendation-script.py');
+      this.pythonWorker = pythonWrapper.startWorker(scriptPath, ['--worker']);
+      this.workerChannels = null;
+      this.workerHistoryDirty = true;
+      await this.pythonWorker.request({ type: 'profile', path: PROFILE_FILE });
+      await this.pythonWorker.request({ type: 'cache', dir: RESULT_CACHE_DIR });
+    }
+
+    const worker = this.pythonWorker;
+
+    // The channel list is only re-sent when the playlist array itself changes
+    if (this.workerChannels !== availableChannels) {
+      await worker.request({ type: 'channels', channels: availableChannels }, 30000);
+      this.workerChannels = availableChannels;
+    }
+
+    // Once the profile snapshot exists, new views reach Python through its log
+    if (this.workerHistoryDirty) {
+      if (!fs.existsSync(PROFILE_FILE)) {
+        await worker.request({ type: 'history', history: this.viewingHistory });
+      }
+      this.workerHistoryDirty = false;
+    }
+
+    const result = await worker.request({
+      type: 'recommend',
+      currentChannel: currentChannelId,
+      settings: this.settings,
+      output: 'ids',
+      diagnostics: Boolean(this.settings.diagnostics)
+    });
+
+    if (!Array.isArray(result.recommendations)) {
+      throw new Error('Python worker returned no recommendations');
+    }
+
+    return this.rehydrateRecommendations(result.recommendations, availableChannels);
+  }
+
+  /**
+   * Map id/score results from Python back onto our own channel objects
+   * @param {Array} recommendations - Entries of the form { id, score }
+   * @param {Array} availableChannels - All available channels
+   * @returns {Array} Entries of the form { channel, score }
+   */
+  rehydrateRecommendations(recommendations, availableChannels) {
+    if (this.channelLookup.channels !== availableChannels) {
+      const byId = new Map();
+      for (const channel of availableChannels) {
+        // First occurrence wins for duplicate ids, matching the Python index
+        if (!byId.has(channel.id)) {
+          byId.set(channel.id, channel);
+        }
+      }
+      this.channelLookup = { channels: availableChannels, byId };
+    }
+
+    return recommendations
+      .filter(rec => this.channelLookup.byId.has(rec.id))
+      .map(rec => ({
+        channel: this.channelLookup.byId.get(rec.id),
+        score: rec.score
+      }));
+  }
+
+  /**
+   * Stop the Python worker; the next request starts a fresh one
+   */
+  stopPythonWorker() {
+    if (this.pythonWorker) {
+      this.pythonWorker.stop();
+      this.pythonWorker = null;
+    }
+    this.workerChannels = null;
+  }
+
   /**
    * Get fallback recommendations without Python
    * @param {Array} availableChannels - All available channels
@@ -524,6 +686,15 @@ class RecommendationEngine {
     try {
       this.viewingHistory = [];
       const success = this.saveHistory();
+      
+      // The profile aggregates the same views, so it goes too
+      this.stopPythonWorker();
+      for (const file of [PROFILE_FILE, PROFILE_LOG, `${PROFILE_FILE}.transitions`]) {
+        if (fs.existsSync(file)) {
+          fs.unlinkSync(file);
+        }
+      }
+      
       this.logInfo('Viewing history cleared');
       return success;
     } catch (error) {
@@ -1,109 +1,2218 @@
 #!/usr/bin/env python3
 # recommendation-script.py
 # Script for generating recommendations using Python
+#
+# Usage:
+#   recommendation-script.py <input-file>            One-shot run on a JSON data file
+#   recommendation-script.py --stream <input-file>   One-shot run in constant memory
+#   recommendation-script.py --batch all <input-file>
+#                                                    Precompute recommendations for many
+#                                                    channels, one JSON line each
+#   recommendation-script.py --catalog <catalog-file> <input-file>
+#                                                    Read channels from a binary catalog,
+#                                                    (re)written when the input carries them
+#   recommendation-script.py --worker                Long-lived worker speaking
+#                                                    newline-delimited JSON on stdin/stdout
 
 import sys
 import json
 import os
+import re
+import time
+import argparse
+import bisect
+import contextlib
+import cProfile
+import heapq
+import mmap
+import multiprocessing
+import hashlib
+import random
+import struct
+import tracemalloc
+from array import array
+from collections import OrderedDict
 from datetime import datetime
 
-# Check arguments
-if len(sys.argv) < 2:
-    print(json.dumps({
-        "error": "Missing arguments",
-        "recommendations": []
-    }))
-    sys.exit(1)
+# NumPy is optional; without it scoring runs on the array-module fallback
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
+# resource is Unix-only; diagnostics fall back to tracemalloc for memory without it
 try:
-    # Parse input data
-    input_file = sys.argv[1]
+    import resource
+except ImportError:
+    resource = None
+
+# Channel fields kept by the streaming path; everything else is dropped on read
+SLIM_CHANNEL_FIELDS = ('id', 'name', 'category', 'group')
+
+# Defaults mirror DEFAULT_SETTINGS.recommendationFactors on the JS side,
+# except content similarity, which is off unless the settings ask for it
+DEFAULT_FACTORS = {'genre': 0.5, 'viewTime': 0.3, 'recency': 0.2, 'content': 0.0}
+DEFAULT_RECENCY_HALF_LIFE_DAYS = 7
+
+# Views further apart than this start a new viewing session
+DEFAULT_SESSION_GAP_MINUTES = 30
+
+# Name words that say nothing about what a channel shows
+CONTENT_STOPWORDS = frozenset(('hd', 'sd', 'fhd', 'uhd', '4k', 'tv', 'channel', 'live', 'the', 'and', 'of'))
+_CONTENT_WORD = re.compile(r'[^\W_]+')
+
+
+def channel_category(channel):
+    """Return the lowercased category, falling back to the M3U group."""
+    return (channel.get('category') or channel.get('group') or '').lower()
+
+
+def history_view_time(entry):
+    """Return the seconds watched for a history entry.
+
+    Raw view events carry `viewTimeSeconds`; the JS engine keeps one
+    aggregated entry per channel with `totalViewTime`.
+    """
+    value = entry.get('viewTimeSeconds')
+    if value is None:
+        value = entry.get('totalViewTime')
+    return value or 0
+
+
+def history_timestamp(entry):
+    """Return the epoch seconds of a history entry, or None if unknown."""
+    value = entry.get('timestamp')
+    if value is None:
+        value = entry.get('lastViewed')
+
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        # JS timestamps are in milliseconds
+        return value / 1000 if value > 1e11 else value
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def recency_decay(timestamp, now, half_life):
+    """Exponentially decayed weight of a view that happened at `timestamp`."""
+    if timestamp is None:
+        return 0.0
+    return 0.5 ** (max(0.0, now - timestamp) / half_life)
+
+
+def scoring_factors(settings):
+    """Return the (genre, viewTime, recency) weights and the recency half-life in seconds."""
+    factors = {**DEFAULT_FACTORS, **(settings.get('recommendationFactors') or {})}
+    half_life_days = settings.get('recencyHalfLifeDays') or DEFAULT_RECENCY_HALF_LIFE_DAYS
+    return (factors['genre'], factors['viewTime'], factors['recency']), half_life_days * 86400
+
+
+def content_tokens(channel):
+    """Tokens describing a channel: name words, group words, language and country tags."""
+    tokens = set()
+    attributes = channel.get('attributes') or {}
+
+    name = channel.get('name') or channel.get('title') or attributes.get('tvg-name') or ''
+    for word in _CONTENT_WORD.findall(str(name).lower()):
+        if len(word) > 1 and not word.isdigit() and word not in CONTENT_STOPWORDS:
+            tokens.add(word)
+
+    group = channel.get('group') or channel.get('category') or attributes.get('group-title') or ''
+    for word in _CONTENT_WORD.findall(str(group).lower()):
+        if word not in CONTENT_STOPWORDS:
+            tokens.add('group:' + word)
+
+    # tvg-language / tvg-country may list several values, e.g. "English;Spanish"
+    for key, attribute in (('language', 'tvg-language'), ('country', 'tvg-country')):
+        value = channel.get(key) or attributes.get(attribute)
+        if value:
+            for part in re.split(r'[;,|]', str(value).lower()):
+                if part.strip():
+                    tokens.add(f"{key}:{part.strip()}")
+
+    return tokens
+
+
+class TopK:
+    """Bounded selection of the k best (score, position) items.
+
+    Ties on score are broken by catalog position, so the result matches a
+    stable descending sort of the full list.
+    """
+
+    def __init__(self, k):
+        self.k = max(0, k)
+        self.heap = []
+
+    def push(self, score, position, item):
+        if self.k == 0:
+            return
+
+        entry = (score, -position, item)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def results(self):
+        """Return (score, item) pairs, best first."""
+        ordered = sorted(self.heap, key=lambda entry: (-entry[0], -entry[1]))
+        return [(score, item) for score, _, item in ordered]
+
+
+class ChannelIndex:
+    """Lookup tables over the channel catalog, built once per catalog.
+
+    Scoring against an index is linear in history plus channels, instead of
+    scanning the whole catalog for every history entry. Categories are
+    interned to integer codes (0 means no category) so that scoring can run
+    over flat arrays.
+    """
+
+    def __init__(self, channels):
+        self.channels = channels
+        self.ids = []
+        # Category code per channel, parallel to self.channels
+        self.category_codes = array('i')
+        self.category_names = ['']
+        self.by_id = {}
+        self.position_by_id = {}
+        self.by_category = {}
+        self._numpy_columns = None
+        self._fingerprint = None
+        self._content = None
+
+        code_by_category = {'': 0}
+        for position, channel in enumerate(channels):
+            channel_id = channel.get('id')
+            category = channel_category(channel)
+
+            code = code_by_category.get(category)
+            if code is None:
+                code = code_by_category[category] = len(self.category_names)
+                self.category_names.append(category)
+
+            self.ids.append(channel_id)
+            self.category_codes.append(code)
+            # First occurrence wins for duplicate ids, as the old linear scan did
+            if channel_id not in self.by_id:
+                self.by_id[channel_id] = channel
+                self.position_by_id[channel_id] = position
+            self.by_category.setdefault(category, []).append(channel_id)
+
+        self.category_totals = {
+            category: len(ids) for category, ids in self.by_category.items()
+        }
+
+    def category_of(self, channel_id):
+        """Return the category of a channel id, or None if it is not in the catalog."""
+        channel = self.by_id.get(channel_id)
+        return channel_category(channel) if channel is not None else None
+
+    def numpy_columns(self):
+        """Return (category codes, ids) as NumPy arrays, built on first use."""
+        if self._numpy_columns is None:
+            self._numpy_columns = (
+                np.frombuffer(self.category_codes, dtype=np.intc) if self.channels else np.zeros(0, dtype=np.intc),
+                np.array(self.ids, dtype=object)
+            )
+        return self._numpy_columns
+
+    def content(self):
+        """Return the ContentIndex over this catalog, built on first use."""
+        if self._content is None:
+            self._content = ContentIndex(self.channels)
+        return self._content
+
+    def fingerprint(self):
+        """Hash of the catalog as scoring sees it (ids, categories and content fields in order)."""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for channel, channel_id, code in zip(self.channels, self.ids, self.category_codes):
+                attributes = channel.get('attributes') or {}
+                content = (
+                    channel.get('name') or channel.get('title'),
+                    channel.get('language') or attributes.get('tvg-language'),
+                    channel.get('country') or attributes.get('tvg-country')
+                )
+                digest.update(f"{channel_id!r}\x1f{self.category_names[code]}\x1f{content!r}\x1e".encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def stats(self):
+        """Return the index size for reporting."""
+        return {
+            'channels': len(self.channels),
+            'uniqueIds': len(self.by_id),
+            'categories': len(self.by_category)
+        }
+
+
+class ContentIndex:
+    """Content similarity between channels, from their names and tags.
+
+    Each channel becomes a set of content_tokens. Candidates for a query
+    channel come from MinHash locality-sensitive hashing: signatures are
+    split into bands, and channels sharing any band with the query are
+    candidates. Each band is a sorted array of band hashes searched with
+    bisect, so a query costs a few binary searches plus the candidates
+    themselves. Buckets too large to be informative, like every channel
+    sharing one big group, are skipped. The inverted index (token ->
+    channels) tops up queries that LSH leaves short, rarest token first.
+    Candidates are then ranked by their exact Jaccard similarity.
+    """
+
+    PERMUTATIONS = 32
+    BANDS = 16
+    MAX_BUCKET = 1000
+    MIN_CANDIDATES = 50
+    _MASK = (1 << 64) - 1
+
+    def __init__(self, channels):
+        rows = self.PERMUTATIONS // self.BANDS
+        generator = random.Random(0x5EED)
+        # Multiply-shift hashing: (a * x + b) mod 2^64, top 32 bits
+        params = [(generator.getrandbits(64) | 1, generator.getrandbits(64)) for _ in range(self.PERMUTATIONS)]
+
+        self.token_codes = {}
+        # Token codes per channel, CSR over positions
+        self.token_offsets = array('I', [0])
+        self.token_values = array('I')
+        self.signatures = array('I')
+        self.signed = array('b')
+        postings = []
+        band_keys = [array('q') for _ in range(self.BANDS)]
+        token_signatures = []
+        # Token set -> (signature, band hashes); channel names repeat a lot
+        # once numbers and quality tags are dropped
+        memo = {(): ((0,) * self.PERMUTATIONS, (hash(((0,) * rows)),) * self.BANDS)}
+
+        for position, channel in enumerate(channels):
+            tokens = content_tokens(channel) if isinstance(channel, dict) else ()
+
+            codes = []
+            for token in tokens:
+                code = self.token_codes.get(token)
+                if code is None:
+                    code = self.token_codes[token] = len(token_signatures)
+                    value = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+                    token_signatures.append(tuple(((a * value + b) & self._MASK) >> 32 for a, b in params))
+                    postings.append([])
+                codes.append(code)
+                postings[code].append(position)
+            codes = tuple(sorted(codes))
+            self.token_values.extend(codes)
+            self.token_offsets.append(len(self.token_values))
+
+            entry = memo.get(codes)
+            if entry is None:
+                signature = tuple(map(min, *(token_signatures[code] for code in codes))) \
+                    if len(codes) > 1 else token_signatures[codes[0]]
+                entry = memo[codes] = (
+                    signature,
+                    tuple(hash(signature[band * rows:(band + 1) * rows]) for band in range(self.BANDS))
+                )
+            self.signed.append(1 if codes else 0)
+            self.signatures.extend(entry[0])
+            for keys, key in zip(band_keys, entry[1]):
+                keys.append(key)
+
+        # Per band: positions sorted by band hash, and the hashes in that order
+        self.band_positions = []
+        self.band_sorted = []
+        for keys in band_keys:
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            self.band_positions.append(array('I', order))
+            self.band_sorted.append(array('q', (keys[position] for position in order)))
+
+        self.posting_offsets = array('I', [0])
+        self.posting_values = array('I')
+        for positions in postings:
+            self.posting_values.extend(positions)
+            self.posting_offsets.append(len(self.posting_values))
+
+    def tokens_of(self, position):
+        return self.token_values[self.token_offsets[position]:self.token_offsets[position + 1]]
+
+    def candidates(self, position):
+        """Positions likely to be similar to `position` (may include it)."""
+        if not self.signed[position]:
+            return set()
+
+        rows = self.PERMUTATIONS // self.BANDS
+        signature = self.signatures[position * self.PERMUTATIONS:(position + 1) * self.PERMUTATIONS]
+        found = set()
+        for band in range(self.BANDS):
+            key = hash(tuple(signature[band * rows:(band + 1) * rows]))
+            keys = self.band_sorted[band]
+            low = bisect.bisect_left(keys, key)
+            high = bisect.bisect_right(keys, key, low)
+            if high - low <= self.MAX_BUCKET:
+                found.update(self.band_positions[band][low:high])
+
+        if len(found) < self.MIN_CANDIDATES:
+            postings = sorted(
+                (self.posting_offsets[code + 1] - self.posting_offsets[code], code)
+                for code in self.tokens_of(position)
+            )
+            for size, code in postings:
+                if len(found) >= self.MAX_BUCKET:
+                    break
+                start = self.posting_offsets[code]
+                found.update(self.posting_values[start:start + min(size, self.MAX_BUCKET)])
+
+        return found
+
+    def similar(self, positions):
+        """Return {position: best Jaccard similarity to any of `positions`}."""
+        best = {}
+        for seed in positions:
+            seed_tokens = set(self.tokens_of(seed))
+            if not seed_tokens:
+                continue
+            for candidate in self.candidates(seed):
+                if candidate == seed:
+                    continue
+                tokens = self.tokens_of(candidate)
+                shared = len(seed_tokens.intersection(tokens))
+                if shared:
+                    similarity = shared / (len(seed_tokens) + len(tokens) - shared)
+                    if similarity > best.get(candidate, 0.0):
+                        best[candidate] = similarity
+        return best
+
+    def stats(self):
+        """Return the index size for reporting."""
+        return {
+            'tokens': len(self.token_codes),
+            'channels': int(sum(self.signed))
+        }
+
+
+class StaleCatalogError(Exception):
+    """The binary catalog is missing or does not match the caller's checksum."""
+
+
+class BinaryCatalog:
+    """Channel catalog in a versioned binary file, read in place through mmap.
+
+    Layout, little-endian:
+      header      magic, version, channel/category/string counts, string
+                  data size and the checksum of the channel list it holds
+      records     one fixed-width record per channel: string codes for id,
+                  name, group, language, country and the channel's JSON,
+                  then its category code
+      categories  string code per category code (code 0 is no category)
+      offsets     string table offsets, one more than there are strings
+      strings     UTF-8 string data
+
+    Strings are interned, so a group or language shared by thousands of
+    channels is stored once. Fields are read through memoryview casts of
+    the mapping; a channel's JSON is only decoded when it is returned.
+    """
+
+    MAGIC = b'RCAT'
+    VERSION = 1
+    # magic, version, channels, categories, strings, string bytes, checksum
+    HEADER = struct.Struct('<4sHxxIIII64s')
+    FIELDS = ('id', 'name', 'group', 'language', 'country', 'json', 'category')
+    NONE = 0xFFFFFFFF
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self.HEADER.size:
+                raise StaleCatalogError(f"Catalog {path} is truncated")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Validate against the mapping itself before taking any views, which
+        # would otherwise keep it from being closed on the way out
+        magic, version, channel_count, category_count, string_count, string_size, checksum = \
+            self.HEADER.unpack_from(self._mmap)
+        lengths = (channel_count * len(self.FIELDS), category_count, string_count + 1)
+        if magic != self.MAGIC or version != self.VERSION:
+            self._mmap.close()
+            raise StaleCatalogError(f"Catalog {path} has an unsupported format")
+        if self.HEADER.size + 4 * sum(lengths) + string_size > size:
+            self._mmap.close()
+            raise StaleCatalogError(f"Catalog {path} is truncated")
+
+        self.checksum = checksum.rstrip(b'\0').decode('utf-8')
+        self.channel_count = channel_count
+
+        view = memoryview(self._mmap)
+        position = self.HEADER.size
+        sections = []
+        for length in lengths:
+            section = view[position:position + length * 4].cast('I')
+            if sys.byteorder != 'little':
+                section = array('I', section)
+                section.byteswap()
+            sections.append(section)
+            position += length * 4
+
+        self.records, self.categories, self.offsets = sections
+        self.strings = view[position:position + string_size]
+
+    @classmethod
+    def write(cls, path, channels, checksum):
+        """Atomically write `channels` as a catalog tagged with `checksum`."""
+        strings = {}
+        data = bytearray()
+        offsets = array('I', [0])
+
+        def intern(value):
+            if value is None:
+                return cls.NONE
+            value = str(value)
+            code = strings.get(value)
+            if code is None:
+                code = strings[value] = len(offsets) - 1
+                data.extend(value.encode('utf-8'))
+                offsets.append(len(data))
+            return code
+
+        category_codes = {'': 0}
+        categories = array('I', [intern('')])
+        records = array('I')
+        for channel in channels:
+            attributes = channel.get('attributes') or {}
+            category = channel_category(channel)
+            code = category_codes.get(category)
+            if code is None:
+                code = category_codes[category] = len(categories)
+                categories.append(intern(category))
+
+            # The same fallbacks content_tokens applies, resolved once here
+            records.extend((
+                intern(channel.get('id')),
+                intern(channel.get('name') or channel.get('title') or attributes.get('tvg-name')),
+                intern(channel.get('group') or channel.get('category') or attributes.get('group-title')),
+                intern(channel.get('language') or attributes.get('tvg-language')),
+                intern(channel.get('country') or attributes.get('tvg-country')),
+                intern(json.dumps(channel, separators=(',', ':'))),
+                code
+            ))
+
+        checksum_bytes = checksum.encode('utf-8')
+        if len(checksum_bytes) > 64:
+            raise ValueError("Catalog checksum is longer than 64 bytes")
+
+        arrays = [records, categories, offsets]
+        if sys.byteorder != 'little':
+            for values in arrays:
+                values.byteswap()
+
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(channels), len(categories),
+                                    len(offsets) - 1, len(data), checksum_bytes))
+            for values in arrays:
+                values.tofile(f)
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def string(self, code):
+        if code == self.NONE:
+            return None
+        return str(self.strings[self.offsets[code]:self.offsets[code + 1]], 'utf-8')
+
+    def field(self, name):
+        """Zero-copy view of one field across all records."""
+        return self.records[self.FIELDS.index(name)::len(self.FIELDS)]
+
+    def channel(self, position):
+        """Decode one channel's original JSON."""
+        return json.loads(self.string(self.records[position * len(self.FIELDS) + self.FIELDS.index('json')]))
+
+    def close(self):
+        # Views into the mapping must go before it can be closed
+        self.records = self.categories = self.offsets = self.strings = None
+        self._mmap.close()
+
+
+def catalog_checksum(channels):
+    """Checksum of a channel list, for callers that do not supply their own."""
+    material = json.dumps(channels, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(material.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CatalogChannels:
+    """Read-only sequence of channels that decodes each one on access."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __len__(self):
+        return self.catalog.channel_count
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.catalog.channel_count:
+            raise IndexError(position)
+        return self.catalog.channel(position)
+
+
+class CatalogIndex(ChannelIndex):
+    """ChannelIndex served from a BinaryCatalog.
+
+    Category codes are read straight out of the mapped records; only the
+    ids, the category names and the id lookup are built in memory. There is
+    no by_id table of channel dicts: use position_by_id and channels[...].
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.channels = CatalogChannels(catalog)
+        self.ids = [catalog.string(code) for code in catalog.field('id')]
+        self.category_codes = catalog.field('category')
+        self.category_names = [catalog.string(code) for code in catalog.categories]
+        self.position_by_id = {}
+        for position, channel_id in enumerate(self.ids):
+            self.position_by_id.setdefault(channel_id, position)
+        self._numpy_columns = None
+        self._fingerprint = None
+        self._content = None
+
+    @classmethod
+    def load(cls, path, channels=None, checksum=None):
+        """Open the catalog at `path`, rewriting it first if `channels` are given and it is stale.
+
+        Without channels, a missing catalog or one whose checksum differs
+        from `checksum` raises StaleCatalogError, so the caller can resend
+        the channel list.
+        """
+        if channels is not None and checksum is None:
+            checksum = catalog_checksum(channels)
+
+        catalog = None
+        if os.path.exists(path):
+            try:
+                catalog = BinaryCatalog(path)
+            except StaleCatalogError:
+                if channels is None:
+                    raise
+
+        if catalog is not None and checksum is not None and catalog.checksum != checksum:
+            catalog.close()
+            catalog = None
+
+        if catalog is None:
+            if channels is None:
+                raise StaleCatalogError(f"Catalog {path} is missing or stale; resend the channels")
+            BinaryCatalog.write(path, channels, checksum)
+            catalog = BinaryCatalog(path)
+
+        return cls(catalog)
+
+    def category_of(self, channel_id):
+        position = self.position_by_id.get(channel_id)
+        return self.category_names[self.category_codes[position]] if position is not None else None
+
+    def numpy_columns(self):
+        if self._numpy_columns is None:
+            self._numpy_columns = (
+                np.asarray(self.category_codes, dtype=np.uint32).astype(np.intc),
+                np.array(self.ids, dtype=object)
+            )
+        return self._numpy_columns
+
+    def content(self):
+        if self._content is None:
+            catalog = self.catalog
+            names, groups, languages, countries = (
+                catalog.field(name) for name in ('name', 'group', 'language', 'country')
+            )
+            # One short-lived dict at a time, in the shape content_tokens reads
+            self._content = ContentIndex(
+                {
+                    'name': catalog.string(name),
+                    'group': catalog.string(group),
+                    'language': catalog.string(language),
+                    'country': catalog.string(country)
+                }
+                for name, group, language, country in zip(names, groups, languages, countries)
+            )
+        return self._content
+
+    def fingerprint(self):
+        return f"catalog:{self.catalog.checksum}"
+
+    def stats(self):
+        return {
+            'channels': len(self.channels),
+            'uniqueIds': len(self.position_by_id),
+            'categories': len(set(self.category_codes))
+        }
+
+
+def load_index(input_data, catalog_path=None):
+    """Build the channel index from the input, or from a binary catalog."""
+    if catalog_path:
+        return CatalogIndex.load(catalog_path, input_data.get('channels'), input_data.get('catalogChecksum'))
+    return ChannelIndex(input_data.get('channels', []))
+
+
+class HistoryColumns:
+    """History resolved against a ChannelIndex, as parallel arrays.
+
+    Entries whose channel is not in the catalog are dropped. History for the
+    current channel is kept: it still says something about its category.
+    """
+
+    def __init__(self):
+        self.positions = array('q')
+        self.view_times = array('d')
+        self.recency = array('d')
+
+    def append(self, position, view_time, recency):
+        self.positions.append(position)
+        self.view_times.append(view_time)
+        self.recency.append(recency)
+
+    @classmethod
+    def from_history(cls, history, index, now, half_life):
+        """One row per raw history entry."""
+        columns = cls()
+        for entry in history:
+            position = index.position_by_id.get(entry.get('channelId'))
+            if position is not None:
+                columns.append(
+                    position,
+                    history_view_time(entry),
+                    recency_decay(history_timestamp(entry), now, half_life)
+                )
+        return columns
+
+    @classmethod
+    def from_profile(cls, profile, index, now):
+        """One row per channel of an aggregated ProfileStore."""
+        columns = cls()
+        # Counters are stored decayed to the watermark; one factor brings them to now
+        shift = recency_decay(profile.watermark, now, profile.half_life) if profile.watermark is not None else 0.0
+        for channel_id, record in profile.channels.items():
+            position = index.position_by_id.get(channel_id)
+            if position is not None:
+                columns.append(position, record[0], record[2] * shift)
+        return columns
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class TransitionIndex:
+    """Sparse channel-to-channel transition counts ("watched X, then Y").
+
+    Views closer together than the session gap form a session, and each
+    change of channel within a session counts as one transition. Channel ids
+    are interned to integer codes and the matrix is kept in CSR form: the
+    neighbours of source code s are targets[offsets[s]:offsets[s + 1]] with
+    matching counts. New transitions collect in a small per-source map and
+    are merged into the arrays on save, so a lookup only touches the current
+    channel's neighbours.
+
+    Views not newer than the last observed one are ignored, so feeding the
+    same events twice (say, after an interrupted save) changes nothing.
+    On disk: a fixed header, the id table as JSON, then the three arrays.
+    """
+
+    MAGIC = b'RTRX'
+    VERSION = 1
+    # magic, version, ids, edges, id table bytes, last timestamp, last code (-1: none)
+    HEADER = struct.Struct('<4sHxxIIIdi')
+
+    def __init__(self, path=None, session_gap=DEFAULT_SESSION_GAP_MINUTES * 60):
+        self.path = path
+        self.session_gap = session_gap
+        self.ids = []
+        self.codes = {}
+        self.offsets = array('I', [0])
+        self.targets = array('I')
+        self.counts = array('I')
+        # source code -> {target code: count}, not yet merged into the arrays
+        self.pending = {}
+        # (code, timestamp) of the newest observed view
+        self.last = None
+        self.dirty = False
+
+    @classmethod
+    def from_history(cls, history, session_gap=DEFAULT_SESSION_GAP_MINUTES * 60):
+        """Build an in-memory index from raw history entries."""
+        transitions = cls(session_gap=session_gap)
+        transitions.observe_history(history)
+        return transitions
+
+    def load(self):
+        """Read the index file if there is one; a foreign or corrupt file starts afresh."""
+        if not self.path or not os.path.exists(self.path):
+            return self
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        try:
+            magic, version, id_count, edge_count, table_size, last_timestamp, last_code = \
+                self.HEADER.unpack_from(data)
+            if magic != self.MAGIC or version != self.VERSION:
+                return self
+
+            position = self.HEADER.size
+            ids = json.loads(data[position:position + table_size].decode('utf-8'))
+            position += table_size
+
+            arrays = []
+            for length in (id_count + 1, edge_count, edge_count):
+                values = array('I')
+                values.frombytes(data[position:position + length * values.itemsize])
+                if len(values) != length:
+                    return self
+                position += length * values.itemsize
+                arrays.append(values)
+        except (struct.error, ValueError):
+            return self
+
+        if sys.byteorder == 'big':
+            for values in arrays:
+                values.byteswap()
+
+        self.ids = ids
+        self.codes = {channel_id: code for code, channel_id in enumerate(ids)}
+        self.offsets, self.targets, self.counts = arrays
+        self.last = (last_code, last_timestamp) if last_code >= 0 else None
+        return self
+
+    def code(self, channel_id):
+        """Intern a channel id."""
+        code = self.codes.get(channel_id)
+        if code is None:
+            code = self.codes[channel_id] = len(self.ids)
+            self.ids.append(channel_id)
+        return code
+
+    def observe(self, views):
+        """Record (timestamp, channel id) views, oldest first; returns new transitions."""
+        added = 0
+        for timestamp, channel_id in views:
+            if self.last is not None and timestamp <= self.last[1]:
+                continue
+
+            code = self.code(channel_id)
+            if self.last is not None and code != self.last[0] and timestamp - self.last[1] <= self.session_gap:
+                row = self.pending.setdefault(self.last[0], {})
+                row[code] = row.get(code, 0) + 1
+                added += 1
+            self.last = (code, timestamp)
+            self.dirty = True
+        return added
+
+    def observe_history(self, entries):
+        """Record history entries in timestamp order; entries without one are skipped."""
+        views = []
+        for entry in entries:
+            timestamp = history_timestamp(entry)
+            if timestamp is not None:
+                views.append((timestamp, entry.get('channelId')))
+        views.sort(key=lambda view: view[0])
+        return self.observe(views)
+
+    def neighbours(self, channel_id):
+        """Return {target code: count} for one channel."""
+        code = self.codes.get(channel_id)
+        if code is None:
+            return {}
+
+        row = {}
+        if code + 1 < len(self.offsets):
+            start, end = self.offsets[code], self.offsets[code + 1]
+            row = dict(zip(self.targets[start:end], self.counts[start:end]))
+        for target, count in self.pending.get(code, {}).items():
+            row[target] = row.get(target, 0) + count
+        return row
+
+    def next_channels(self, channel_id, k=5, known=None):
+        """Most likely next channels after `channel_id` as {id, probability}.
+
+        Probabilities are shares of the channel's outgoing transitions.
+        With `known` (a container of ids), targets outside it are skipped.
+        """
+        row = self.neighbours(channel_id)
+        total = sum(row.values())
+        if not total:
+            return []
+
+        candidates = (
+            (count, -target) for target, count in row.items()
+            if known is None or self.ids[target] in known
+        )
+        return [
+            {'id': self.ids[-negative_target], 'probability': count / total}
+            for count, negative_target in heapq.nlargest(k, candidates)
+        ]
+
+    def merge(self):
+        """Fold pending transitions into the CSR arrays."""
+        if not self.pending:
+            return
+
+        offsets = array('I', [0])
+        targets = array('I')
+        counts = array('I')
+        for source in range(len(self.ids)):
+            row = {}
+            if source + 1 < len(self.offsets):
+                start, end = self.offsets[source], self.offsets[source + 1]
+                row = dict(zip(self.targets[start:end], self.counts[start:end]))
+            for target, count in self.pending.get(source, {}).items():
+                row[target] = row.get(target, 0) + count
+            for target in sorted(row):
+                targets.append(target)
+                counts.append(row[target])
+            offsets.append(len(targets))
+
+        self.offsets, self.targets, self.counts = offsets, targets, counts
+        self.pending = {}
+
+    def save(self):
+        """Merge and atomically write the index, if it has a path and changed."""
+        if not self.path or not self.dirty:
+            return
+
+        self.merge()
+        offsets = array('I', self.offsets)
+        # Sources interned after the last transition have no edges yet
+        while len(offsets) < len(self.ids) + 1:
+            offsets.append(offsets[-1])
+        arrays = [offsets, array('I', self.targets), array('I', self.counts)]
+        if sys.byteorder == 'big':
+            for values in arrays:
+                values.byteswap()
+
+        table = json.dumps(self.ids, separators=(',', ':')).encode('utf-8')
+        last_code, last_timestamp = self.last if self.last is not None else (-1, 0.0)
+
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, len(self.ids), len(self.targets),
+                                     len(table), last_timestamp, last_code))
+            f.write(table)
+            for values in arrays:
+                values.tofile(f)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    def stats(self):
+        """Return the index size for reporting."""
+        return {
+            'channels': len(self.ids),
+            'edges': len(self.targets) + sum(len(row) for row in self.pending.values()),
+            'sessionGap': self.session_gap
+        }
+
+
+class ProfileStore:
+    """Persisted viewing profile, maintained incrementally.
+
+    <path>          JSON snapshot of per-channel and per-category counters plus
+                    the watermark (timestamp of the newest folded view)
+    <path>.log      append-only NDJSON of view events not yet folded in
+    <path>.transitions
+                    binary TransitionIndex fed from the same events
+
+    Recency counters are stored decayed to the watermark, so folding new views
+    rescales the existing counters once and adds the new ones. A run only
+    touches events newer than the watermark, however long the history grows.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.log_path = path + '.log'
+        self.folding_path = self.log_path + '.folding'
+        self.half_life = DEFAULT_RECENCY_HALF_LIFE_DAYS * 86400
+        self.watermark = None
+        # channel id -> [view time, view count, decayed views, last viewed, category]
+        self.channels = {}
+        # category -> [view time, decayed views]
+        self.categories = {}
+        self.transitions = TransitionIndex(path + '.transitions')
+        self.folded = 0
+        self.dirty = False
+        self._log_folded = False
+
+    def load(self):
+        """Read the snapshot if there is one; an unknown version starts afresh."""
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.half_life = data.get('halfLife', self.half_life)
+                self.watermark = data.get('watermark')
+                self.channels = data.get('channels', {})
+                self.categories = data.get('categories', {})
+                # Without the snapshot the views get folded again, and so
+                # would their transitions
+                self.transitions.load()
+        return self
+
+    def set_half_life(self, half_life):
+        """Switch the decay half-life.
+
+        Exact re-basing would need the raw history, which the profile no
+        longer holds, so each channel is treated as if all of its views
+        happened at its last view time.
+        """
+        if half_life == self.half_life:
+            return
+
+        self.half_life = half_life
+        self.categories = {}
+        for record in self.channels.values():
+            record[2] = record[1] * recency_decay(record[3], self.watermark, half_life)
+            if record[4]:
+                category = self.categories.setdefault(record[4], [0, 0.0])
+                category[0] += record[0]
+                category[1] += record[2]
+        self.dirty = True
+
+    def fold(self, entries, category_of=None):
+        """Fold view events newer than the watermark; returns how many were folded.
+
+        Events without a timestamp cannot be placed against the watermark
+        and are skipped. `category_of(channel_id)` resolves a channel's
+        category; the entry's channelGroup is used when it returns None.
+        """
+        events = []
+        for entry in entries:
+            timestamp = history_timestamp(entry)
+            if timestamp is not None and (self.watermark is None or timestamp > self.watermark):
+                events.append((timestamp, entry))
+
+        if not events:
+            return 0
+
+        watermark = max(timestamp for timestamp, _ in events)
+        if self.watermark is not None:
+            shift = recency_decay(self.watermark, watermark, self.half_life)
+            for record in self.channels.values():
+                record[2] *= shift
+            for record in self.categories.values():
+                record[1] *= shift
+        self.watermark = watermark
+
+        events.sort(key=lambda event: event[0])
+        self.transitions.observe((timestamp, entry.get('channelId')) for timestamp, entry in events)
+
+        for timestamp, entry in events:
+            channel_id = entry.get('channelId')
+            view_time = history_view_time(entry)
+            decay = recency_decay(timestamp, watermark, self.half_life)
+
+            record = self.channels.get(channel_id)
+            if record is None:
+                category = category_of(channel_id) if category_of else None
+                if category is None:
+                    category = (entry.get('channelGroup') or '').lower()
+                record = self.channels[channel_id] = [0, 0, 0.0, timestamp, category]
+
+            record[0] += view_time
+            record[1] += 1
+            record[2] += decay
+            record[3] = max(record[3], timestamp)
+            if record[4]:
+                category = self.categories.setdefault(record[4], [0, 0.0])
+                category[0] += view_time
+                category[1] += decay
+
+        self.folded += len(events)
+        self.dirty = True
+        return len(events)
+
+    def _fold_file(self, path, category_of):
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted append
+                    continue
+        self._log_folded = True
+        return self.fold(entries, category_of)
+
+    def fold_log(self, category_of=None):
+        """Fold the delta log into the profile.
+
+        The log is moved aside before reading so that views appended in the
+        meantime land in a fresh log instead of being truncated away. A
+        leftover moved-aside log from an interrupted run is folded first; the
+        watermark keeps it from being counted twice.
+        """
+        folded = 0
+        if os.path.exists(self.folding_path):
+            folded += self._fold_file(self.folding_path, category_of)
+            self.save()
+
+        if os.path.exists(self.log_path):
+            os.replace(self.log_path, self.folding_path)
+            folded += self._fold_file(self.folding_path, category_of)
+
+        return folded
+
+    def save(self):
+        """Atomically write the snapshot, then drop the folded log."""
+        self.transitions.save()
+        if self.dirty:
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': self.VERSION,
+                    'halfLife': self.half_life,
+                    'watermark': self.watermark,
+                    'updatedAt': datetime.now().isoformat(),
+                    'channels': self.channels,
+                    'categories': self.categories
+                }, f, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+            self.dirty = False
+
+        if self._log_folded:
+            if os.path.exists(self.folding_path):
+                os.remove(self.folding_path)
+            self._log_folded = False
+
+    def refresh(self, history, half_life, category_of=None, session_gap=None):
+        """Bring the profile up to date with the log and any new history, and persist it."""
+        self.set_half_life(half_life)
+        if session_gap is not None:
+            self.transitions.session_gap = session_gap
+        self.fold_log(category_of)
+        self.fold(history, category_of)
+        self.save()
+
+    def version(self):
+        """Changes whenever a view is folded in or the decay is re-based."""
+        return f"{self.watermark}:{len(self.channels)}:{self.half_life}"
+
+    def stats(self):
+        """Return the profile size for reporting."""
+        return {
+            'channels': len(self.channels),
+            'categories': len(self.categories),
+            'watermark': self.watermark,
+            'folded': self.folded,
+            'transitions': self.transitions.stats()
+        }
+
+
+class ResultCache:
+    """LRU cache of scored results, with an optional on-disk tier.
+
+    Keys are built from fingerprints of everything that affects a result
+    (catalog, profile or history, current channel, settings and a coarse
+    time bucket for recency), so an edited playlist or a newly recorded view
+    simply stops matching old entries. Values are (score, position) pairs
+    plus the normalizing score; channels are looked up again on a hit, so a
+    hit renders exactly like a fresh run.
+    """
+
+    def __init__(self, capacity=128, directory=None, disk_capacity=1024):
+        self.capacity = capacity
+        self.directory = directory
+        self.disk_capacity = disk_capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(index, history_version, current_channel, settings, now):
+        ttl = settings.get('cacheTtlSeconds') or 300
+        material = json.dumps(
+            [index.fingerprint(), history_version, current_channel, settings, int(now // ttl)],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.blake2b(material.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Return (scored, max_score) or None."""
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        if self.directory:
+            try:
+                with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                value = ([tuple(pair) for pair in data['scored']], data['maxScore'])
+            except (OSError, ValueError, KeyError):
+                value = None
+
+            if value is not None:
+                self.disk_hits += 1
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key, scored, max_score):
+        value = (scored, max_score)
+        self._remember(key, value)
+
+        if self.directory:
+            path = self._disk_path(key)
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'scored': scored, 'maxScore': max_score}, f)
+            os.replace(temp_path, path)
+            self._trim_disk()
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def _trim_disk(self):
+        """Drop the least recently written files beyond disk_capacity."""
+        with os.scandir(self.directory) as it:
+            files = [entry for entry in it if entry.name.endswith('.json')]
+        if len(files) <= self.disk_capacity:
+            return
+
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.disk_capacity]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Return hit/miss counters for reporting."""
+        return {
+            'hits': self.hits,
+            'diskHits': self.disk_hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+            'capacity': self.capacity
+        }
+
+
+def history_fingerprint(history):
+    """Hash of a raw history list, for cache keys when there is no profile."""
+    material = json.dumps(history, sort_keys=True, default=str)
+    return hashlib.blake2b(material.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _factor_terms(values, weight):
+    """Scale one factor's raw values to weight * value / max(values)."""
+    peak = max(values, default=0)
+    if peak <= 0:
+        return None
+    return [weight * value / peak for value in values]
+
+
+def score_python(index, columns, weights, current_channel, k, boost=None):
+    """Multi-factor scoring over array-module columns.
+
+    `boost` maps positions to an extra score added after the factors.
+    Returns ((score, position) pairs best first, highest score). This is the
+    reference implementation the NumPy path must match.
+    """
+    genre_weight, view_weight, recency_weight = weights
+    codes = index.category_codes
+    channel_count = len(index.channels)
+
+    genre = array('d', bytes(8 * len(index.category_names)))
+    view = array('d', bytes(8 * channel_count))
+    recency = array('d', bytes(8 * channel_count))
+    for position, view_time, decay in zip(columns.positions, columns.view_times, columns.recency):
+        genre[codes[position]] += view_time
+        view[position] += view_time
+        recency[position] += decay
+    genre[0] = 0.0
+
+    genre_terms = _factor_terms(genre, genre_weight) or [0.0] * len(genre)
+    view_peak = max(view, default=0)
+    recency_peak = max(recency, default=0)
+
+    top = TopK(k)
+    max_score = 0.0
+    ids = index.ids
+    for position in range(channel_count):
+        if ids[position] == current_channel:
+            continue
+
+        score = genre_terms[codes[position]]
+        if view_peak > 0:
+            score += view_weight * view[position] / view_peak
+        if recency_peak > 0:
+            score += recency_weight * recency[position] / recency_peak
+        if boost:
+            score += boost.get(position, 0.0)
+
+        top.push(score, position, position)
+        if score > max_score:
+            max_score = score
+
+    return top.results(), max_score
+
+
+def score_numpy(index, columns, weights, current_channel, k, boost=None):
+    """Vectorized equivalent of score_python."""
+    genre_weight, view_weight, recency_weight = weights
+    codes, ids = index.numpy_columns()
+    channel_count = len(index.channels)
+
+    positions = np.frombuffer(columns.positions, dtype=np.int64) if len(columns) else np.zeros(0, dtype=np.int64)
+    view_times = np.array(columns.view_times, dtype=np.float64)
+    decays = np.array(columns.recency, dtype=np.float64)
+
+    genre = np.bincount(codes[positions], weights=view_times, minlength=len(index.category_names))
+    genre[0] = 0.0
+    view = np.bincount(positions, weights=view_times, minlength=channel_count)
+    recency = np.bincount(positions, weights=decays, minlength=channel_count)
+
+    scores = np.zeros(channel_count)
+    if genre.max(initial=0) > 0:
+        scores += (genre_weight * genre / genre.max())[codes]
+    if view.max(initial=0) > 0:
+        scores += view_weight * view / view.max()
+    if recency.max(initial=0) > 0:
+        scores += recency_weight * recency / recency.max()
+    if boost:
+        boosted = np.fromiter(boost.keys(), dtype=np.int64, count=len(boost))
+        scores[boosted] += np.fromiter(boost.values(), dtype=np.float64, count=len(boost))
+
+    candidates = np.flatnonzero(ids != current_channel)
+    if len(candidates) == 0 or k <= 0:
+        return [], 0.0
+
+    candidate_scores = scores[candidates]
+    max_score = float(candidate_scores.max())
+
+    # Narrow to everything tied with or above the k-th best, then order by
+    # (score desc, position asc) to match TopK exactly
+    if k < len(candidates):
+        kth = np.partition(candidate_scores, len(candidates) - k)[len(candidates) - k]
+        candidates = candidates[candidate_scores >= kth]
+        candidate_scores = scores[candidates]
+    order = np.lexsort((candidates, -candidate_scores))[:k]
+
+    return [(float(scores[position]), int(position)) for position in candidates[order]], max_score
+
+
+SCORERS = {'python': score_python, 'numpy': score_numpy}
+
+
+def resolve_backend(backend):
+    """Pick the scoring backend; 'auto' prefers NumPy when it is installed."""
+    if backend in (None, 'auto'):
+        return 'numpy' if np is not None else 'python'
+    if backend == 'numpy' and np is None:
+        raise RuntimeError('NumPy backend requested but NumPy is not installed')
+    if backend not in SCORERS:
+        raise ValueError(f"Unknown scoring backend: {backend}")
+    return backend
+
+
+def format_recommendations(scored, max_score, output='full', fields=None):
+    """Turn (score, channel) pairs into result entries.
+
+    output='full' embeds the channel dict. output='ids' returns only the id
+    and score (plus the requested `fields`), for callers that rehydrate
+    channels from their own catalog.
+    """
+    recommendations = []
+    for score, channel in scored:
+        # Normalize scores
+        score = score / max_score if max_score > 0 else 0
+
+        if output == 'ids':
+            entry = {'id': channel.get('id'), 'score': score}
+            if fields:
+                entry['fields'] = {field: channel.get(field) for field in fields}
+        else:
+            entry = {'channel': channel, 'score': score}
+
+        recommendations.append(entry)
+
+    return recommendations
+
+
+class Diagnostics:
+    """Opt-in timings and memory figures for one request.
+
+    Phases are timed with the monotonic perf_counter and reported in
+    milliseconds, in the order they first ran. Peak memory is the process
+    peak RSS from resource (for a worker, since it started), or the traced
+    peak from tracemalloc where resource is not available. With a
+    `cprofile_path`, the request also runs under cProfile and the stats are
+    dumped there. A disabled instance costs one attribute check per phase.
+    """
+
+    def __init__(self, enabled=False, cprofile_path=None):
+        self.enabled = enabled or bool(cprofile_path)
+        self.cprofile_path = cprofile_path
+        self.phases = {}
+        self.counts = {}
+        self.stats = {}
+        self._profiler = None
+        self._tracing = False
+        self._started = time.perf_counter()
+
+        if self.enabled and resource is None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        if cprofile_path:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def phase(self, name):
+        """Context manager timing one phase; repeated phases add up."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._timed(name)
+
+    @contextlib.contextmanager
+    def _timed(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, **counts):
+        if self.enabled:
+            self.counts.update(counts)
+
+    def report(self):
+        """Stop profiling and return the diagnostics block."""
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.cprofile_path)
+            self._profiler = None
+
+        memory = {}
+        if resource is not None:
+            # ru_maxrss is KiB on Linux and bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            memory['peakRssMB'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            memory['tracedPeakMB'] = round(peak / (1024 * 1024), 1)
+            if self._tracing:
+                tracemalloc.stop()
+                self._tracing = False
+
+        report = {
+            'phasesMs': {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            'totalMs': round((time.perf_counter() - self._started) * 1000, 3),
+            'memory': memory,
+            'counts': self.counts,
+            'stats': self.stats
+        }
+        if self.cprofile_path:
+            report['cprofile'] = self.cprofile_path
+        return report
+
+    def dumps(self, result):
+        """Serialize `result`, adding the diagnostics block when enabled.
+
+        The result is serialized first and the block spliced in after, so
+        the serialize phase covers the real payload.
+        """
+        if not self.enabled:
+            return json.dumps(result)
+
+        with self.phase('serialize'):
+            body = json.dumps(result)
+        block = json.dumps(self.report())
+        return f"{body[:-1]}, \"diagnostics\": {block}}}" if body != '{}' else f'{{"diagnostics": {block}}}'
+
+
+# Shared disabled instance for callers that did not ask for diagnostics
+NO_DIAGNOSTICS = Diagnostics()
+
+
+def content_boost(index, columns, current_channel, settings):
+    """Content-similarity scores as {position: weight * similarity / best similarity}.
+
+    Seeds are the current channel plus the most recently watched channels
+    (`contentSeeds`, default 3). Empty when the content factor is off.
+    """
+    weight = {**DEFAULT_FACTORS, **(settings.get('recommendationFactors') or {})}['content']
+    if weight <= 0:
+        return {}
+
+    recency = {}
+    for position, decay in zip(columns.positions, columns.recency):
+        recency[position] = recency.get(position, 0.0) + decay
+    seeds = heapq.nlargest(settings.get('contentSeeds', 3), recency, key=recency.__getitem__)
+    current_position = index.position_by_id.get(current_channel)
+    if current_position is not None:
+        seeds.append(current_position)
+
+    similar = index.content().similar(seeds)
+    peak = max(similar.values(), default=0.0)
+    if peak <= 0:
+        return {}
+    return {position: weight * similarity / peak for position, similarity in similar.items()}
+
+
+def history_columns(history, index, half_life, now, profile=None):
+    """Scoring columns from a refreshed profile, or from the raw history."""
+    if profile is not None:
+        return HistoryColumns.from_profile(profile, index, now)
+    return HistoryColumns.from_history(history, index, now, half_life)
+
+
+def generate_recommendations(history, index, current_channel, settings, output='full', fields=None,
+                             backend='auto', now=None, profile=None, cache=None, transitions=None,
+                             diagnostics=NO_DIAGNOSTICS):
+    """Score channels against the viewing history and return the result dict.
+
+    With a ProfileStore, `history` holds only new view events: they are
+    folded into the profile and scoring reads the profile's aggregates.
+    With a ResultCache, a repeat request skips scoring entirely.
+    `transitions` is a TransitionIndex already covering `history`; the
+    profile's own index is used with a profile, and without either one is
+    built from the history. Phases are timed into `diagnostics`.
+    """
+    backend = resolve_backend(backend)
+    weights, half_life = scoring_factors(settings)
+    now = time.time() if now is None else now
+    session_gap = settings.get('sessionGapMinutes', DEFAULT_SESSION_GAP_MINUTES) * 60
+
+    if profile is not None:
+        with diagnostics.phase('profile'):
+            profile.refresh(history, half_life, index.category_of, session_gap)
+        transitions = profile.transitions
+
+    cached = None
+    if cache is not None:
+        with diagnostics.phase('cache'):
+            history_version = profile.version() if profile is not None else history_fingerprint(history)
+            cache_key = ResultCache.make_key(index, history_version, current_channel, settings, now)
+            cached = cache.get(cache_key)
+
+    if cached is not None:
+        scored, max_score = cached
+    else:
+        with diagnostics.phase('aggregate'):
+            columns = history_columns(history, index, half_life, now, profile)
+        with diagnostics.phase('content'):
+            boost = content_boost(index, columns, current_channel, settings)
+        # Scoring includes the top-K selection, which the scorers fuse into one pass
+        with diagnostics.phase('score'):
+            scored, max_score = SCORERS[backend](
+                index,
+                columns,
+                weights,
+                current_channel,
+                settings.get('maxRecommendations', 10),
+                boost
+            )
+        diagnostics.count(historyRows=len(columns), contentMatches=len(boost))
+
+        if cache is not None:
+            with diagnostics.phase('cache'):
+                cache.put(cache_key, scored, max_score)
+
+    with diagnostics.phase('format'):
+        channels = [(score, index.channels[position]) for score, position in scored]
+        result = {
+            'timestamp': datetime.now().isoformat(),
+            'recommendations': format_recommendations(channels, max_score, output, fields),
+            'method': 'python-ml',
+            'backend': backend,
+            'output': output,
+            'index': index.stats()
+        }
+    if current_channel is not None:
+        with diagnostics.phase('transitions'):
+            if transitions is None:
+                transitions = TransitionIndex.from_history(history, session_gap)
+            result['nextChannels'] = transitions.next_channels(
+                current_channel,
+                settings.get('maxNextChannels', 5),
+                index.position_by_id
+            )
+    if profile is not None:
+        result['profile'] = profile.stats()
+    if cache is not None:
+        result['cacheHit'] = cached is not None
+        result['cache'] = cache.stats()
+
+    diagnostics.count(history=len(history), channels=len(index.channels), recommendations=len(scored))
+    if diagnostics.enabled:
+        diagnostics.stats.update(index=result['index'], cacheHit=cached is not None)
+        for key in ('cache', 'profile'):
+            if key in result:
+                diagnostics.stats[key] = result[key]
+        if index._content is not None:
+            diagnostics.stats['content'] = index._content.stats()
+
+    return result
+
+
+def run_once(input_file, output='full', fields=None, backend='auto', profile_path=None, cache_dir=None,
+             catalog_path=None, diagnostics=NO_DIAGNOSTICS):
+    """Read a JSON data file, score it and print the result."""
+    with diagnostics.phase('parse'):
+        with open(input_file, 'r', encoding='utf-8') as f:
+            input_data = json.load(f)
+
+    with diagnostics.phase('index'):
+        index = load_index(input_data, catalog_path)
+
+    result = generate_recommendations(
+        input_data.get('history', []),
+        index,
+        input_data.get('currentChannel'),
+        input_data.get('settings', {}),
+        output,
+        fields,
+        backend,
+        input_data.get('now'),
+        ProfileStore(profile_path).load() if profile_path else None,
+        # A one-shot process only benefits from the on-disk tier
+        ResultCache(directory=cache_dir) if cache_dir else None,
+        diagnostics=diagnostics
+    )
+
+    print(diagnostics.dumps(result))
+
+
+# Stands in for "no current channel" when ranking the whole catalog once
+_NO_CHANNEL = object()
+
+# Per-process state for batch formatting, set by _init_batch_worker
+_batch_state = None
+
+
+def _init_batch_worker(ranking, k, output, fields):
+    global _batch_state
+    _batch_state = (ranking, k, output, fields)
+
+
+def _format_batch_chunk(current_ids):
+    """Render one JSON line per current channel from the shared ranking."""
+    ranking, k, output, fields = _batch_state
+    lines = []
+
+    for current in current_ids:
+        picked = []
+        max_score = None
+        for score, channel_id, channel in ranking:
+            if channel_id == current:
+                continue
+            if max_score is None:
+                max_score = score
+            if len(picked) == k:
+                break
+            picked.append((score, channel))
+
+        lines.append(json.dumps({
+            'currentChannel': current,
+            'recommendations': format_recommendations(picked, max_score or 0.0, output, fields)
+        }))
+
+    return ''.join(line + '\n' for line in lines)
+
+
+def run_batch(input_file, channels, output='full', fields=None, backend='auto', profile_path=None,
+              jobs=None, chunk_size=500, catalog_path=None):
+    """Print recommendations for many current channels as JSON lines.
+
+    Scores do not depend on the current channel, which is only excluded
+    from its own list. (The content factor would break that, so batch
+    runs leave it out.) So the catalog is scored and ranked once, deep enough
+    that every channel's list can be read off the shared ranking by skipping
+    its own id; per-channel work is just that filter plus serialization,
+    which is spread over a process pool. The last line is a summary.
+    """
+    started = time.monotonic()
     with open(input_file, 'r', encoding='utf-8') as f:
         input_data = json.load(f)
-    
-    # Extract data
-    history = input_data.get('history', [])
-    channels = input_data.get('channels', [])
-    current_channel = input_data.get('currentChannel')
+
+    index = load_index(input_data, catalog_path)
     settings = input_data.get('settings', {})
-    
-    # Calculate scores based on viewing history
-    channel_scores = {}
-    
-    # Skip current channel from recommendations
-    channels = [c for c in channels if c.get('id') != current_channel]
-    
-    # If we have history data
-    if history:
-        # Get categories/genres from history
-        watched_categories = {}
-        
-        for entry in history:
-            channel_id = entry.get('channelId')
-            view_time = entry.get('viewTimeSeconds', 0)
-            timestamp = entry.get('timestamp', 0)
-            
-            # Find the channel
-            channel = next((c for c in channels if c.get('id') == channel_id), None)
-            
-            if channel:
-                category = channel.get('category', '').lower()
-                if category:
-                    if category not in watched_categories:
-                        watched_categories[category] = 0
-                    watched_categories[category] += view_time
-        
-        # Calculate recommendations
-        max_score = 1
-        for channel in channels:
-            score = 0
+    history = input_data.get('history', [])
+    now = input_data.get('now')
+    now = time.time() if now is None else now
+    backend = resolve_backend(backend)
+    weights, half_life = scoring_factors(settings)
+
+    profile = ProfileStore(profile_path).load() if profile_path else None
+    if profile is not None:
+        profile.refresh(history, half_life, index.category_of)
+
+    if channels == 'all':
+        current_ids = list(index.position_by_id)
+    else:
+        current_ids = [channel_id for channel_id in channels.split(',') if channel_id]
+
+    # Excluding a channel skips every copy of its id plus needs one entry
+    # beyond its list for the normalizing score
+    k = max(0, settings.get('maxRecommendations', 10))
+    copies = {}
+    for channel_id in index.ids:
+        copies[channel_id] = copies.get(channel_id, 0) + 1
+    depth = max(k, 1) + max(copies.values(), default=0)
+
+    columns = history_columns(history, index, half_life, now, profile)
+    scored, _ = SCORERS[backend](index, columns, weights, _NO_CHANNEL, depth)
+    ranking = [(score, index.ids[position], index.channels[position]) for score, position in scored]
+
+    chunks = [current_ids[i:i + chunk_size] for i in range(0, len(current_ids), chunk_size)]
+    jobs = jobs or os.cpu_count() or 1
+    init_args = (ranking, k, output, fields)
+
+    if jobs > 1 and len(chunks) > 1:
+        with multiprocessing.Pool(min(jobs, len(chunks)), _init_batch_worker, init_args) as pool:
+            # imap keeps input order while chunks are formatted in parallel
+            for block in pool.imap(_format_batch_chunk, chunks):
+                sys.stdout.write(block)
+    else:
+        _init_batch_worker(*init_args)
+        for chunk in chunks:
+            sys.stdout.write(_format_batch_chunk(chunk))
+
+    summary = {
+        'channels': len(current_ids),
+        'rankingDepth': len(ranking),
+        'jobs': jobs if len(chunks) > 1 else 1,
+        'backend': backend,
+        'output': output,
+        'index': index.stats(),
+        'elapsedSeconds': round(time.monotonic() - started, 3)
+    }
+    if profile is not None:
+        summary['profile'] = profile.stats()
+    sys.stdout.write(json.dumps({'summary': summary}) + '\n')
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DELIMITERS = ' \t\n\r,:]}'
+
+
+class JsonStreamReader:
+    """Incremental reader that walks a JSON document without loading it whole.
+
+    Containers are entered token by token through iter_object/iter_array;
+    leaf values (and array items) are decoded one at a time from a small
+    rolling buffer, so memory is bounded by the largest single item.
+    """
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at the end."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, found '{found}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number split across chunks decodes as a shorter number
+                # ("-25" of "-2500.0"), so only trust a value that is followed
+                # by a delimiter or ends the input
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def skip(self):
+        """Step over the next value without building it.
+
+        Arrays are walked item by item, so skipping a large array costs no
+        more memory than reading one of its items.
+        """
+        char = self.peek()
+        if char == '[':
+            for _ in self.iter_array():
+                pass
+        elif char == '{':
+            for _ in self.iter_object():
+                self.skip()
+        else:
+            self.value()
+
+    def iter_array(self):
+        """Yield the items of the array at the current position."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or ']' at offset {self.pos - 1}")
+
+    def iter_object(self):
+        """Yield the keys of the object at the current position.
+
+        The caller must consume each key's value (value, iter_array or
+        iter_object) before asking for the next key.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or '}}' at offset {self.pos - 1}")
+
+
+def slim_channel(channel):
+    """Keep only the channel fields that scoring and the result need."""
+    return {field: channel[field] for field in SLIM_CHANNEL_FIELDS if field in channel}
+
+
+def _stream_channels(input_file):
+    """Yield every channel of a data file, one at a time."""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        reader = JsonStreamReader(f)
+        for key in reader.iter_object():
+            if key == 'channels':
+                yield from reader.iter_array()
+            else:
+                reader.skip()
+
+
+def _resolve_watched(channels, wanted):
+    """Find the category of each wanted channel id while streaming the catalog.
+
+    Returns (channel count, category count, category by resolved id). Ids
+    not in the catalog are left out, like the index does.
+    """
+    channel_count = 0
+    category_names = set()
+    watched_category = {}
+
+    for channel in channels:
+        channel_count += 1
+        category = channel_category(channel)
+        category_names.add(category)
+        # Discard so that duplicate ids resolve to their first occurrence only
+        channel_id = channel.get('id')
+        if channel_id in wanted:
+            wanted.discard(channel_id)
+            watched_category[channel_id] = category
+
+    return channel_count, len(category_names), watched_category
+
+
+def run_stream(input_file, output='full', fields=None, profile_path=None, diagnostics=NO_DIAGNOSTICS):
+    """Score a data file in constant memory and print the result.
+
+    The first pass collects the (small) history, picks up currentChannel and
+    settings, and resolves watched ids to categories while streaming the
+    catalog (a further pass is needed only when the catalog comes before the
+    history in the file). The last pass streams the catalog again and keeps
+    only the top-K channels. Memory grows with the history, not the catalog.
+    The content factor needs an index over the whole catalog and is left out.
+    """
+    profile = ProfileStore(profile_path).load() if profile_path else None
+    events = []
+    wanted = set(profile.channels) if profile is not None else set()
+    history_seen = False
+    current_channel = None
+    settings = {}
+    now = None
+    stats = None
+
+    with diagnostics.phase('scan'):
+        with open(input_file, 'r', encoding='utf-8') as f:
+            reader = JsonStreamReader(f)
+            for key in reader.iter_object():
+                if key == 'history':
+                    history_seen = True
+                    for entry in reader.iter_array():
+                        # Keep only what scoring and the profile read
+                        events.append({
+                            'channelId': entry.get('channelId'),
+                            'channelGroup': entry.get('channelGroup'),
+                            'viewTimeSeconds': history_view_time(entry),
+                            'timestamp': history_timestamp(entry)
+                        })
+                        wanted.add(entry.get('channelId'))
+                elif key == 'channels' and history_seen:
+                    stats = _resolve_watched(reader.iter_array(), wanted)
+                elif key == 'currentChannel':
+                    current_channel = reader.value()
+                elif key == 'settings':
+                    settings = reader.value() or {}
+                elif key == 'now':
+                    now = reader.value()
+                else:
+                    reader.skip()
+
+        if stats is None:
+            stats = _resolve_watched(_stream_channels(input_file), wanted)
+        channel_count, category_count, watched_category = stats
+
+    (genre_weight, view_weight, recency_weight), half_life = scoring_factors(settings)
+    now = time.time() if now is None else now
+
+    # channel id -> [view time, recency], for ids found in the catalog
+    with diagnostics.phase('aggregate'):
+        watched = {}
+        if profile is not None:
+            profile.refresh(events, half_life, watched_category.get)
+            shift = recency_decay(profile.watermark, now, half_life) if profile.watermark is not None else 0.0
+            for channel_id, record in profile.channels.items():
+                if channel_id in watched_category:
+                    watched[channel_id] = [record[0], record[2] * shift]
+        else:
+            for event in events:
+                channel_id = event['channelId']
+                if channel_id in watched_category:
+                    views = watched.setdefault(channel_id, [0, 0.0])
+                    views[0] += event['viewTimeSeconds']
+                    views[1] += recency_decay(event['timestamp'], now, half_life)
+
+        genre = {}
+        view = {}
+        recency = {}
+        for channel_id, (view_time, decayed) in watched.items():
+            category = watched_category[channel_id]
+            if category:
+                genre[category] = genre.get(category, 0) + view_time
+            view[channel_id] = view_time
+            recency[channel_id] = decayed
+
+        genre_peak = max(genre.values(), default=0)
+        genre_terms = {
+            category: genre_weight * value / genre_peak
+            for category, value in genre.items()
+        } if genre_peak > 0 else {}
+        view_peak = max(view.values(), default=0)
+        recency_peak = max(recency.values(), default=0)
+
+    with diagnostics.phase('score'):
+        top = TopK(settings.get('maxRecommendations', 10))
+        max_score = 0.0
+        scored_ids = set()
+
+        for position, channel in enumerate(_stream_channels(input_file)):
             channel_id = channel.get('id')
-            category = channel.get('category', '').lower()
-            
-            # Category match
-            if category in watched_categories:
-                cat_weight = settings.get('recommendationFactors', {}).get('genre', 0.5)
-                score += watched_categories[category] * cat_weight
-            
-            # Store score
-            channel_scores[channel_id] = score
+            if channel_id == current_channel:
+                continue
+
+            score = genre_terms.get(channel_category(channel), 0.0)
+            # Per-channel factors apply to the first occurrence of an id only
+            if channel_id in watched and channel_id not in scored_ids:
+                scored_ids.add(channel_id)
+                if view_peak > 0:
+                    score += view_weight * view[channel_id] / view_peak
+                if recency_peak > 0:
+                    score += recency_weight * recency[channel_id] / recency_peak
+
+            top.push(score, position, channel)
             if score > max_score:
                 max_score = score
-        
-        # Normalize scores
-        for channel_id in channel_scores:
-            channel_scores[channel_id] /= max_score
-    
-    # Create result
-    recommendations = []
-    for channel in channels:
-        channel_id = channel.get('id')
-        score = channel_scores.get(channel_id, 0)
-        
-        recommendations.append({
-            'channel': channel,
-            'score': score
-        })
-    
-    # Sort by score
-    recommendations.sort(key=lambda x: x['score'], reverse=True)
-    
-    # Limit to max recommendations
-    max_recommendations = settings.get('maxRecommendations', 10)
-    recommendations = recommendations[:max_recommendations]
-    
-    # Output result
-    result = {
-        'timestamp': datetime.now().isoformat(),
-        'recommendations': recommendations,
-        'method': 'python-ml'
-    }
-    
-    print(json.dumps(result))
-    
-except Exception as e:
-    print(json.dumps({
-        "error": str(e),
-        "recommendations": []
-    }))
-    sys.exit(1)
+
+        scored = top.results()
+
+    with diagnostics.phase('format'):
+        if output == 'full':
+            # Only the k survivors are trimmed down to the fields the result carries
+            scored = [(score, slim_channel(channel)) for score, channel in scored]
+        result = {
+            'timestamp': datetime.now().isoformat(),
+            'recommendations': format_recommendations(scored, max_score, output, fields),
+            'method': 'python-ml',
+            'backend': 'stream',
+            'output': output,
+            'index': {
+                'channels': channel_count,
+                'categories': category_count
+            },
+            **({'profile': profile.stats()} if profile is not None else {})
+        }
+
+    diagnostics.count(history=len(events), channels=channel_count, recommendations=len(scored))
+    if diagnostics.enabled:
+        diagnostics.stats['index'] = result['index']
+    print(diagnostics.dumps(result))
+
+
+class RecommendationWorker:
+    """Keeps the channel catalog and history in memory between requests.
+
+    Each request is one JSON object per line with a `type` and an optional
+    `id` that is echoed back in the response. Supported types:
+
+      channels       replace the channel catalog (`channels`)
+      history        replace the viewing history (`history`)
+      historyAppend  append one entry (`entry`) or several (`entries`)
+      settings       replace the settings (`settings`)
+      profile        keep an incremental ProfileStore at `path`; history
+                     messages then carry new view events, which are folded
+                     into the profile on the next recommend
+      cache          resize the result cache (`size`, 0 disables it) and set
+                     or clear its on-disk tier (`dir`)
+      recommend      score for `currentChannel`; optional `settings` override,
+                     `output` ('full' or 'ids'), `fields` to return with ids,
+                     `backend` ('auto', 'numpy' or 'python') and `now`;
+                     `diagnostics: true` adds a diagnostics block and
+                     `cprofile` dumps cProfile stats for the request there
+      next           likely next channels after `channelId` (`k`, default 5)
+      ping           liveness check
+      shutdown       stop the worker
+    """
+
+    def __init__(self):
+        self.index = ChannelIndex([])
+        self.history = []
+        self.settings = {}
+        self.profile = None
+        self.cache = ResultCache()
+        # Built from the in-memory history on first use, then kept up to date
+        self.transitions = None
+        # Diagnostics of the request being answered, for run_worker to serialize
+        self.diagnostics = NO_DIAGNOSTICS
+        self.running = True
+
+    def current_transitions(self):
+        """The profile's TransitionIndex, or one over the in-memory history."""
+        if self.profile is not None:
+            return self.profile.transitions
+        if self.transitions is None:
+            gap = self.settings.get('sessionGapMinutes', DEFAULT_SESSION_GAP_MINUTES) * 60
+            self.transitions = TransitionIndex.from_history(self.history, gap)
+        return self.transitions
+
+    def handle(self, message):
+        """Apply one request and return the response dict."""
+        message_type = message.get('type')
+
+        if message_type == 'channels':
+            self.index = ChannelIndex(message.get('channels') or [])
+            return {'ok': True, 'index': self.index.stats()}
+
+        if message_type == 'history':
+            self.history = message.get('history') or []
+            self.transitions = None
+            return {'ok': True, 'history': len(self.history)}
+
+        if message_type == 'historyAppend':
+            entries = ([message['entry']] if 'entry' in message else []) + (message.get('entries') or [])
+            self.history.extend(entries)
+            if self.transitions is not None:
+                self.transitions.observe_history(entries)
+            return {'ok': True, 'history': len(self.history)}
+
+        if message_type == 'settings':
+            self.settings = message.get('settings') or {}
+            return {'ok': True}
+
+        if message_type == 'profile':
+            self.profile = ProfileStore(message['path']).load() if message.get('path') else None
+            return {'ok': True, 'profile': self.profile.stats() if self.profile else None}
+
+        if message_type == 'cache':
+            size = message.get('size', 128)
+            self.cache = ResultCache(size, message.get('dir')) if size else None
+            return {'ok': True, 'cache': self.cache.stats() if self.cache else None}
+
+        if message_type == 'recommend':
+            settings = message.get('settings')
+            if settings is None:
+                settings = self.settings
+            self.diagnostics = Diagnostics(bool(message.get('diagnostics')), message.get('cprofile'))
+            result = generate_recommendations(
+                self.history,
+                self.index,
+                message.get('currentChannel'),
+                settings,
+                message.get('output', 'full'),
+                message.get('fields'),
+                message.get('backend', 'auto'),
+                message.get('now'),
+                self.profile,
+                self.cache,
+                None if self.profile is not None else self.current_transitions(),
+                self.diagnostics
+            )
+            if self.profile is not None:
+                # Folded into the profile; keeping them would only re-filter them
+                self.history = []
+            result['ok'] = True
+            return result
+
+        if message_type == 'next':
+            return {
+                'ok': True,
+                'nextChannels': self.current_transitions().next_channels(
+                    message.get('channelId'),
+                    message.get('k', 5),
+                    self.index.position_by_id
+                )
+            }
+
+        if message_type == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+
+        if message_type == 'shutdown':
+            self.running = False
+            return {'ok': True}
+
+        raise ValueError(f"Unknown request type: {message_type}")
+
+
+def run_worker(stdin, stdout):
+    """Serve newline-delimited JSON requests until shutdown or end of input."""
+    worker = RecommendationWorker()
+
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        worker.diagnostics = NO_DIAGNOSTICS
+        try:
+            message = json.loads(line)
+            request_id = message.get('id')
+            response = worker.handle(message)
+        except Exception as e:
+            response = {'ok': False, 'error': str(e), 'recommendations': []}
+
+        response['id'] = request_id
+        stdout.write(worker.diagnostics.dumps(response) + '\n')
+        stdout.flush()
+
+        if not worker.running:
+            break
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Generate channel recommendations')
+    parser.add_argument('input_file', nargs='?', help='JSON data file with history, channels and settings')
+    parser.add_argument('--worker', action='store_true', help='serve newline-delimited JSON requests on stdin')
+    parser.add_argument('--stream', action='store_true', help='parse the input incrementally in constant memory')
+    parser.add_argument('--output', choices=('full', 'ids'), default='full',
+                        help="'ids' returns channel ids and scores instead of whole channels")
+    parser.add_argument('--fields', default='', help='comma-separated channel fields to return with --output ids')
+    parser.add_argument('--profile', help='incremental profile snapshot to read, update and score from')
+    parser.add_argument('--cache-dir', help='directory for the on-disk result cache')
+    parser.add_argument('--catalog', help='binary channel catalog; rewritten when the input carries channels')
+    parser.add_argument('--batch', metavar='CHANNELS',
+                        help="precompute for 'all' channels or a comma-separated list of ids, as JSON lines")
+    parser.add_argument('--jobs', type=int, help='worker processes for --batch (default: CPU count)')
+    parser.add_argument('--backend', choices=('auto', 'numpy', 'python'), default='auto',
+                        help='scoring backend; auto uses NumPy when installed')
+    parser.add_argument('--diagnostics', action='store_true',
+                        help='add per-phase timings, memory and counts to the result')
+    parser.add_argument('--cprofile', metavar='FILE', help='dump cProfile stats for the run to FILE')
+    args = parser.parse_args(argv[1:])
+
+    if args.worker:
+        # The Electron side always speaks UTF-8, whatever the OS locale says
+        sys.stdin.reconfigure(encoding='utf-8')
+        sys.stdout.reconfigure(encoding='utf-8')
+        run_worker(sys.stdin, sys.stdout)
+        return 0
+
+    # Check arguments
+    if not args.input_file:
+        print(json.dumps({
+            "error": "Missing arguments",
+            "recommendations": []
+        }))
+        return 1
+
+    fields = [field for field in args.fields.split(',') if field]
+
+    try:
+        if args.batch:
+            run_batch(args.input_file, args.batch, args.output, fields, args.backend, args.profile, args.jobs,
+                      catalog_path=args.catalog)
+        elif args.stream:
+            run_stream(args.input_file, args.output, fields, args.profile,
+                       Diagnostics(args.diagnostics, args.cprofile))
+        else:
+            run_once(args.input_file, args.output, fields, args.backend, args.profile, args.cache_dir, args.catalog,
+                     Diagnostics(args.diagnostics, args.cprofile))
+    except StaleCatalogError as e:
+        print(json.dumps({
+            "error": str(e),
+            "staleCatalog": True,
+            "recommendations": []
+        }))
+        return 1
+    except Exception as e:
+        print(json.dumps({
+            "error": str(e),
+            "recommendations": []
+        }))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
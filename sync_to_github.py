@@ -4,10 +4,21 @@ import sys
 import subprocess
 import logging
 from datetime import datetime
-from time import sleep
 import platform
 import io
+import shlex
 import fnmatch
+import json
+import time
+import argparse
+import asyncio
+import ctypes
+import ctypes.util
+import struct
+import re
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 # Set up logging
@@ -21,10 +32,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger("github_sync")
 
+# One JSON line per run, next to sync_log.txt, so step timings can be compared across runs
+SYNC_METRICS_PATH = os.path.join(os.path.dirname(os.path.abspath(file_handler.baseFilename)), "sync_metrics.jsonl")
+
 # CONFIG
 REPO_PATH = os.path.abspath(os.path.dirname(__file__))
 REMOTE_URL = "https://github.com/tootallderr/HighCastPlayer"
-COMMIT_MESSAGE = f"📝 Auto-sync on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
 # Don't hardcode the branch name, let's detect it dynamically
 DEFAULT_BRANCH = "main"  # Use 'main' as the default branch for all operations
 
@@ -35,121 +48,435 @@ GIT_CONFIG = {
     "diff.renames": "true"         # Ensure rename detection is enabled
 }
 
+def commit_message():
+    return f"📝 Auto-sync on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+
 LARGE_FILE_THRESHOLD_MB = 90  # Set below GitHub's 100MB limit
 
+# Persisted directory index for the large-file scan, kept inside .git so it is never committed
+SCAN_INDEX_PATH = os.path.join(REPO_PATH, ".git", "sync_scan_index.json")
+# Directory mtimes don't change when a file grows in place, so walk everything again this often
+SCAN_FULL_INTERVAL_HOURS = 24
+
+# Paths per `git add --pathspec-from-file` call when staging file by file
+STAGE_CHUNK_SIZE = 2000
+
+# Watch mode: quiet period before a burst of edits is committed, minimum gap between pushes,
+# and the poll interval used where inotify is not available
+WATCH_DEBOUNCE_SECONDS = 5
+WATCH_PUSH_INTERVAL_SECONDS = 120
+WATCH_POLL_SECONDS = 2
+
+# Repository maintenance runs only when `git count-objects -v` crosses these thresholds
+MAINTENANCE_STATE_PATH = os.path.join(REPO_PATH, ".git", "sync_maintenance.json")
+MAINTENANCE_THRESHOLDS = {
+    "looseObjects": 2000,       # Pack loose objects beyond this count
+    "packs": 20,                # Repack incrementally beyond this many packs
+    "commitGraphHours": 24,     # Rewrite the commit-graph at most this often
+    "minIntervalMinutes": 60,   # Never repeat the same task more often than this
+    "garbageAgeMinutes": 60     # Leave temporary pack files younger than this to running git processes
+}
+
+# Per-probe timeouts in seconds; the probes run concurrently so a sync waits for the slowest, not the sum
+CHECK_TIMEOUTS = {
+    "git": 10,
+    "network": 5,
+    "remote": 20,
+    "auth": 5
+}
+
 class GitSyncException(Exception):
     """Custom exception for Git sync errors"""
     pass
 
-def run_command(command, cwd, check_error=True, silent=False):
-    """Run a shell command and return result with improved error handling"""
+class SyncMetrics:
+    """Wall time and subprocess counts per sync step"""
+
+    def __init__(self, mode="sync"):
+        self.mode = mode
+        self.started = datetime.now()
+        self.steps = {}
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _entry(self, name):
+        return self.steps.setdefault(name, {"wallMs": 0.0, "runs": 0, "subprocesses": 0, "subprocessMs": 0.0})
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """Attribute the wall time and subprocesses of the block (on this thread) to a step."""
+        previous = getattr(self._local, "step", None)
+        self._local.step = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self._local.step = previous
+            with self._lock:
+                entry = self._entry(name)
+                entry["wallMs"] += elapsed
+                entry["runs"] += 1
+
+    def record_subprocess(self, elapsed):
+        name = getattr(self._local, "step", None) or "other"
+        with self._lock:
+            entry = self._entry(name)
+            entry["subprocesses"] += 1
+            entry["subprocessMs"] += elapsed * 1000
+
+    def summary(self, result=None):
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "mode": self.mode,
+            "result": result,
+            "totalMs": round((time.perf_counter() - self._t0) * 1000, 1),
+            "subprocesses": sum(entry["subprocesses"] for entry in self.steps.values()),
+            "steps": {
+                name: {key: round(value, 1) if isinstance(value, float) else value for key, value in entry.items()}
+                for name, entry in self.steps.items()
+            }
+        }
+
+    def finish(self, result, path=None):
+        """Log a one-line breakdown and append the summary to the metrics file."""
+        summary = self.summary(result)
+        breakdown = ", ".join(
+            f"{name} {entry['wallMs']:.0f}ms/{entry['subprocesses']}p" for name, entry in summary["steps"].items()
+        )
+        logger.info(f"⏱️ {summary['totalMs'] / 1000:.2f}s, {summary['subprocesses']} git/ping processes: {breakdown}")
+        try:
+            with open(path or SYNC_METRICS_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary) + "\n")
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write sync metrics: {str(e)}")
+        return summary
+
+# Replaced at the start of every sync (or watch cycle); run_command reports into it
+metrics = SyncMetrics()
+
+# "Writing objects:  45% (9/20), 1.20 MiB | 3.40 MiB/s"
+PROGRESS_LINE = re.compile(r"^(?:remote: )?(?P<phase>[A-Z][\w ]+):\s+(?P<percent>\d+)% \((?P<done>\d+)/(?P<total>\d+)\)")
+
+class GitProgress:
+    """Live progress parsed from git output, drawn with tqdm when it is installed"""
+
+    def __init__(self, label):
+        self.label = label
+        self.phase = None
+        self.bar = None
+        self.files = 0
+        self._logged = -1
+        try:
+            from tqdm import tqdm
+            self._tqdm = tqdm
+        except ImportError:
+            self._tqdm = None
+
+    def _start(self, phase, total=None):
+        self.close()
+        self.phase = phase
+        self._logged = -1
+        if self._tqdm:
+            self.bar = self._tqdm(total=total, desc=f"{self.label}: {phase}", ncols=80, leave=False)
+
+    def update(self, line):
+        """Consume a --progress line; returns False for lines that aren't progress."""
+        match = PROGRESS_LINE.match(line)
+        if not match:
+            return False
+        phase, percent = match["phase"], int(match["percent"])
+        done, total = int(match["done"]), int(match["total"])
+        if phase != self.phase:
+            self._start(phase, total)
+        if self.bar:
+            self.bar.n = done
+            self.bar.refresh()
+        elif percent // 25 > self._logged:
+            self._logged = percent // 25
+            logger.info(f"   {self.label}: {phase} {percent}% ({done}/{total})")
+        return True
+
+    def count(self, line):
+        """Count a `git add --verbose` line."""
+        if not (line.startswith("add '") or line.startswith("remove '")):
+            return False
+        if self.phase is None:
+            self._start("files")
+        self.files += 1
+        if self.bar:
+            self.bar.update(1)
+        elif self.files % 1000 == 0:
+            logger.info(f"   {self.label}: {self.files} files")
+        return True
+
+    def close(self):
+        if self.bar:
+            self.bar.close()
+            self.bar = None
+
+class RepoStatus:
+    """Working tree state parsed from a single `git status --porcelain=v2 --branch -z` call"""
+
+    def __init__(self):
+        self.oid = None
+        self.branch = None
+        self.upstream = None
+        self.ahead = 0
+        self.behind = 0
+        self.staged = []
+        self.unstaged = []
+        self.untracked = []
+        self.conflicted = []
+
+    @property
+    def has_commits(self):
+        return self.oid is not None and self.oid != "(initial)"
+
+    @property
+    def detached(self):
+        return self.branch is None or self.branch == "(detached)"
+
+    @property
+    def has_changes(self):
+        return bool(self.staged or self.unstaged or self.untracked or self.conflicted)
+
+    @classmethod
+    def parse(cls, output):
+        """Parse NUL-separated porcelain v2 records"""
+        status = cls()
+        records = iter(output.split("\0"))
+        for record in records:
+            if not record:
+                continue
+            kind = record[0]
+            if kind == "#":
+                key, _, value = record[2:].partition(" ")
+                if key == "branch.oid":
+                    status.oid = value
+                elif key == "branch.head":
+                    status.branch = value
+                elif key == "branch.upstream":
+                    status.upstream = value
+                elif key == "branch.ab":
+                    ahead, behind = value.split()
+                    status.ahead = int(ahead)
+                    status.behind = abs(int(behind))
+            elif kind in "12":
+                fields = record.split(" ", 9 if kind == "2" else 8)
+                xy, path = fields[1], fields[-1]
+                if kind == "2":
+                    # Renames and copies carry the original path as the next record
+                    next(records, None)
+                if xy[0] != ".":
+                    status.staged.append(path)
+                if xy[1] != ".":
+                    status.unstaged.append(path)
+            elif kind == "u":
+                status.conflicted.append(record.split(" ", 10)[-1])
+            elif kind == "?":
+                status.untracked.append(record[2:])
+        return status
+
+def read_status(cwd):
+    """Take one status snapshot of the repository at cwd"""
+    result = run_command(["git", "status", "--porcelain=v2", "--branch", "-z"], cwd, silent=True)
+    return RepoStatus.parse(result.stdout)
+
+def run_command(command, cwd, check_error=True, silent=False, timeout=None, input=None):
+    """Run a command (argument list, no shell) and return result with improved error handling"""
+    display = shlex.join(command)
     if not silent:
-        logger.info(f"Running: {command}")
+        logger.info(f"Running: {display}")
         
+    started = time.perf_counter()
     try:
-        result = subprocess.run(
-            command,
-            cwd=cwd,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding='utf-8',
-            errors='replace'
-        )
+        try:
+            result = subprocess.run(
+                command,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                timeout=timeout,
+                input=input
+            )
+        finally:
+            metrics.record_subprocess(time.perf_counter() - started)
+        return report_result(result, check_error, silent)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"⚠️ Timed out after {timeout}s: {display}")
+        if check_error:
+            raise GitSyncException(f"Command timed out: {display}")
+        return None
+    except Exception as e:
+        logger.error(f"Command failed: {display}")
+        logger.error(f"Error: {str(e)}")
+        if check_error:
+            raise GitSyncException(f"Command failed: {str(e)}")
+        return None
+
+def report_result(result, check_error, silent):
+    """Log a finished command's output and raise on errors when check_error is set"""
+    if not silent and result.stdout:
+        logger.info(result.stdout.strip())
         
-        if not silent and result.stdout:
-            logger.info(result.stdout.strip())
+    if result.stderr:
+        # Don't treat warnings as errors
+        if ("error:" in result.stderr.lower() and "warning:" not in result.stderr.lower()) or result.returncode != 0:
+            logger.error(f"❌ {result.stderr.strip()}")
+            if check_error:
+                raise GitSyncException(result.stderr.strip())
+        elif "warning:" in result.stderr.lower():
+            logger.warning(f"⚠️ {result.stderr.strip()}")
+        elif not silent:
+            logger.info(result.stderr.strip())
             
-        if result.stderr:
-            # Don't treat warnings as errors
-            if ("error:" in result.stderr.lower() and "warning:" not in result.stderr.lower()) or result.returncode != 0:
-                logger.error(f"❌ {result.stderr.strip()}")
-                if check_error:
-                    raise GitSyncException(result.stderr.strip())
-            elif "warning:" in result.stderr.lower():
-                logger.warning(f"⚠️ {result.stderr.strip()}")
-            elif not silent:
-                logger.info(result.stderr.strip())
-                
-        return result
+    return result
+
+def stream_command(command, cwd, progress, check_error=True, silent=False):
+    """Run a git command whose progress output is parsed live instead of collected at the end"""
+    display = shlex.join(command)
+    if not silent:
+        logger.info(f"Running: {display}")
+
+    def drain(pipe, keep, consume):
+        # git redraws progress with \r, so split on both line endings as output arrives
+        pending = ""
+        for chunk in iter(lambda: pipe.read1(8192), b""):
+            pending += chunk.decode("utf-8", errors="replace")
+            *lines, pending = re.split(r"[\r\n]", pending)
+            for line in lines:
+                if line and not consume(line):
+                    keep.append(line)
+        if pending and not consume(pending):
+            keep.append(pending)
+
+    started = time.perf_counter()
+    try:
+        process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     except Exception as e:
-        logger.error(f"Command failed: {command}")
+        metrics.record_subprocess(time.perf_counter() - started)
+        logger.error(f"Command failed: {display}")
         logger.error(f"Error: {str(e)}")
         if check_error:
             raise GitSyncException(f"Command failed: {str(e)}")
         return None
 
-def get_current_branch(cwd):
-    """Get the current Git branch."""
-    result = run_command("git branch --show-current", cwd, silent=True)
-    if result and result.returncode == 0:
-        branch = result.stdout.strip()
-        if branch:
-            return branch
-            
-    # Fallback to more robust method if the above doesn't work
-    result = run_command("git rev-parse --abbrev-ref HEAD", cwd, silent=True)
-    if result and result.returncode == 0:
-        branch = result.stdout.strip()
-        if branch and branch != "HEAD":
-            return branch
-            
-    return DEFAULT_BRANCH
+    stdout, stderr = [], []
+    reader = threading.Thread(target=drain, args=(process.stdout, stdout, progress.count), daemon=True)
+    reader.start()
+    try:
+        drain(process.stderr, stderr, progress.update)
+        reader.join()
+        returncode = process.wait()
+    finally:
+        progress.close()
+        metrics.record_subprocess(time.perf_counter() - started)
+
+    result = subprocess.CompletedProcess(command, returncode, "\n".join(stdout), "\n".join(stderr))
+    return report_result(result, check_error, silent)
+
+def get_current_branch(status):
+    """Get the current Git branch from a status snapshot."""
+    if status.detached:
+        return DEFAULT_BRANCH
+    return status.branch
 
 def apply_git_configs():
     """Apply Git configurations to avoid warnings and improve performance."""
     logger.info("🔧 Applying Git configurations...")
+    # Read the local config once and only write the keys that differ
+    result = run_command(["git", "config", "--local", "--list", "-z"], REPO_PATH, check_error=False, silent=True)
+    current = {}
+    if result and result.returncode == 0:
+        for entry in result.stdout.split("\0"):
+            key, _, value = entry.partition("\n")
+            current[key.lower()] = value
     for key, value in GIT_CONFIG.items():
-        run_command(f'git config {key} {value}', REPO_PATH, silent=True)
+        if current.get(key.lower()) != value:
+            run_command(["git", "config", key, value], REPO_PATH, silent=True)
 
-def has_changes(cwd):
+def has_changes(status):
     """Check if there are changes to commit."""
-    # Check for staged changes
-    staged = run_command("git diff --cached --exit-code", cwd, check_error=False, silent=True)
-    # Check for unstaged changes
-    unstaged = run_command("git diff --exit-code", cwd, check_error=False, silent=True)
-    # Check for untracked files
-    untracked = run_command("git ls-files --others --exclude-standard", cwd, check_error=False, silent=True)
-    
-    return (staged and staged.returncode != 0) or \
-           (unstaged and unstaged.returncode != 0) or \
-           (untracked and untracked.stdout.strip())
+    return status.has_changes
 
-def check_git_installed():
+def check_git_installed(timeout=None):
     """Check if Git is installed on the system."""
     try:
-        run_command("git --version", REPO_PATH, silent=True)
+        run_command(["git", "--version"], REPO_PATH, silent=True, timeout=timeout)
         return True
     except GitSyncException:
         logger.error("❌ Git is not installed or not in PATH. Please install Git.")
         return False
 
-def check_network_connectivity():
+def check_network_connectivity(timeout=None):
     """Check if we can reach GitHub."""
-    cmd = "ping -c 1 github.com" if platform.system() != "Windows" else "ping -n 1 github.com"
+    cmd = ["ping", "-n" if platform.system() == "Windows" else "-c", "1", "github.com"]
     try:
-        result = run_command(cmd, REPO_PATH, check_error=False, silent=True)
+        result = run_command(cmd, REPO_PATH, check_error=False, silent=True, timeout=timeout)
         return result and result.returncode == 0
     except:
         return False
 
-def check_remote_exists():
-    """Check if the remote repository exists and is accessible."""
+def list_remote_heads(timeout=None):
+    """List the branch names on the remote repository, or None if it is not accessible."""
     try:
-        result = run_command(f"git ls-remote {REMOTE_URL}", REPO_PATH, check_error=False, silent=True)
-        return result and result.returncode == 0
+        result = run_command(["git", "ls-remote", "--heads", REMOTE_URL], REPO_PATH, check_error=False, silent=True, timeout=timeout)
+        if not result or result.returncode != 0:
+            return None
+        return {line.split("refs/heads/", 1)[1] for line in result.stdout.splitlines() if "refs/heads/" in line}
     except:
-        return False
+        return None
 
-def check_auth_setup():
+def check_remote_exists(timeout=None):
+    """Check if the remote repository exists and is accessible."""
+    return list_remote_heads(timeout) is not None
+
+def check_auth_setup(timeout=None):
     """Check if GitHub authentication is set up."""
     try:
-        result = run_command("git config --get credential.helper", REPO_PATH, check_error=False, silent=True)
+        result = run_command(["git", "config", "--get", "credential.helper"], REPO_PATH, check_error=False, silent=True, timeout=timeout)
         return result and result.stdout.strip()
     except:
         return False
 
+class PrerequisiteChecks:
+    """Run the independent prerequisite and remote probes in the background while local work proceeds"""
+
+    def __init__(self, timeouts=None):
+        self.timeouts = dict(CHECK_TIMEOUTS, **(timeouts or {}))
+        probes = {
+            "git": check_git_installed,
+            "network": check_network_connectivity,
+            "remote": list_remote_heads,
+            "auth": check_auth_setup
+        }
+        self._executor = ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix="sync-check")
+        self._futures = {
+            name: self._executor.submit(self._run, name, probe)
+            for name, probe in probes.items()
+        }
+
+    def _run(self, name, probe):
+        with metrics.step(f"prereqs.{name}"):
+            return probe(self.timeouts[name])
+
+    def result(self, name, default=None):
+        """Wait for one probe; the subprocess timeout bounds the wait, this is only a backstop"""
+        try:
+            with metrics.step("prereqs"):
+                return self._futures[name].result(timeout=self.timeouts[name] + 5)
+        except FutureTimeout:
+            logger.warning(f"⚠️ The {name} check did not finish in time")
+            return default
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
 def check_and_create_gitignore():
     """Check for .gitignore file and create a default one if it doesn't exist."""
     gitignore_path = os.path.join(REPO_PATH, ".gitignore")
@@ -194,6 +521,7 @@ def check_and_create_gitignore():
             "# Logs",
             "*.log",
             "sync_log.txt",
+            "sync_metrics.jsonl",
             "",
             "# IDE files",
             ".idea/",
@@ -220,176 +548,408 @@ def check_and_create_gitignore():
     
     return False
 
-def auto_ignore_large_files():
-    """Scan for large files and add them to .gitignore automatically."""
-    gitignore_path = os.path.join(REPO_PATH, ".gitignore")
-    large_files = []
-    for root, dirs, files in os.walk(REPO_PATH):
-        # Skip .git directory
-        if ".git" in root:
+def load_ignore_rules(gitignore_path):
+    """Read the top-level .gitignore as (pattern, anchored) pairs for directory pruning."""
+    rules = []
+    try:
+        with open(gitignore_path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        line = line.strip()
+        # Negations can't re-include files under an ignored directory, so they never stop pruning
+        if not line or line.startswith("#") or line.startswith("!"):
             continue
-        for file in files:
-            file_path = os.path.join(root, file)
+        pattern = line.strip("/")
+        if pattern:
+            rules.append((pattern, line.startswith("/") or "/" in pattern))
+    return rules
+
+def is_ignored(rel_path, rules):
+    """Check a repo-relative path against rules from load_ignore_rules."""
+    name = rel_path.rsplit("/", 1)[-1]
+    for pattern, anchored in rules:
+        if fnmatch.fnmatchcase(rel_path if anchored else name, pattern):
+            return True
+    return False
+
+class LargeFileScanner:
+    """Find files over a size threshold, re-reading only directories whose mtime changed since the last run"""
+
+    VERSION = 1
+
+    def __init__(self, root, threshold_bytes, index_path=SCAN_INDEX_PATH):
+        self.root = root
+        self.threshold = threshold_bytes
+        self.index_path = index_path
+        self.dirs = {}
+        self.full_scan = 0
+        self.stats = {"scanned": 0, "reused": 0}
+        self._index = self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == self.VERSION and index.get("threshold") == self.threshold:
+                return index
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    @staticmethod
+    def _rules_key(rules):
+        return "\n".join(f"{'/' if anchored else ''}{pattern}" for pattern, anchored in rules)
+
+    def scan(self, rules):
+        """Return {relative path: size} for every large file outside pruned directories."""
+        index = self._index
+        stale = (
+            index.get("rules") != self._rules_key(rules) or
+            time.time() - index.get("fullScan", 0) > SCAN_FULL_INTERVAL_HOURS * 3600
+        )
+        cached = {} if stale else index.get("dirs", {})
+        self.full_scan = time.time() if stale else index["fullScan"]
+        self.dirs = {}
+        self.stats = {"scanned": 0, "reused": 0}
+
+        try:
+            stack = [("", self.root, os.stat(self.root).st_mtime_ns)]
+        except OSError:
+            return {}
+        while stack:
+            rel, path, mtime_ns = stack.pop()
+            entry = cached.get(rel)
+            if entry and entry["mtime"] == mtime_ns:
+                self.stats["reused"] += 1
+                self.dirs[rel] = entry
+                for name in entry["dirs"]:
+                    child = os.path.join(path, name)
+                    try:
+                        stack.append((f"{rel}/{name}" if rel else name, child, os.stat(child).st_mtime_ns))
+                    except OSError:
+                        continue
+                continue
+
+            self.stats["scanned"] += 1
+            subdirs, large = [], {}
             try:
-                size_mb = os.path.getsize(file_path) / (1024 * 1024)
-                if size_mb > LARGE_FILE_THRESHOLD_MB:
-                    rel_path = os.path.relpath(file_path, REPO_PATH)
-                    large_files.append(rel_path.replace("\\", "/"))
-            except Exception:
+                with os.scandir(path) as it:
+                    for item in it:
+                        child_rel = f"{rel}/{item.name}" if rel else item.name
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                if item.name == ".git" or is_ignored(child_rel, rules):
+                                    continue
+                                subdirs.append(item.name)
+                                stack.append((child_rel, item.path, item.stat(follow_symlinks=False).st_mtime_ns))
+                            elif item.is_file(follow_symlinks=False):
+                                st = item.stat(follow_symlinks=False)
+                                if st.st_size > self.threshold:
+                                    large[item.name] = [st.st_size, st.st_mtime_ns]
+                        except OSError:
+                            continue
+            except OSError:
                 continue
+            self.dirs[rel] = {"mtime": mtime_ns, "dirs": subdirs, "large": large}
+
+        return {
+            f"{rel}/{name}" if rel else name: size
+            for rel, entry in self.dirs.items()
+            for name, (size, _) in entry["large"].items()
+        }
+
+    def save(self, rules):
+        """Persist the directory index; rules should be the ones in effect after any .gitignore update."""
+        if not os.path.isdir(os.path.dirname(self.index_path)):
+            return
+        index = {
+            "version": self.VERSION,
+            "threshold": self.threshold,
+            "rules": self._rules_key(rules),
+            "fullScan": self.full_scan,
+            "dirs": self.dirs
+        }
+        self._index = index
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not save large-file index: {str(e)}")
+
+def auto_ignore_large_files(scanner=None):
+    """Scan for large files and add them to .gitignore automatically."""
+    gitignore_path = os.path.join(REPO_PATH, ".gitignore")
+    rules = load_ignore_rules(gitignore_path)
+    # Watch mode passes a long-lived scanner so the index stays in memory between cycles
+    scanner = scanner or LargeFileScanner(REPO_PATH, LARGE_FILE_THRESHOLD_MB * 1024 * 1024)
+
+    started = time.perf_counter()
+    found = scanner.scan(rules)
+    logger.info(
+        f"🔍 Large-file scan: read {scanner.stats['scanned']} of "
+        f"{scanner.stats['scanned'] + scanner.stats['reused']} directories in {time.perf_counter() - started:.2f}s"
+    )
+
+    # Files already covered by .gitignore (including earlier runs of this function) are left alone
+    large_files = sorted(path for path in found if not is_ignored(path, rules))
 
     if large_files:
         logger.warning(f"⚠️ The following files are larger than {LARGE_FILE_THRESHOLD_MB}MB and will be added to .gitignore:")
+        try:
+            with open(gitignore_path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except OSError:
+            content = ""
         with open(gitignore_path, "a", encoding="utf-8") as f:
+            if content and not content.endswith("\n"):
+                f.write("\n")
             for lf in large_files:
                 logger.warning(f"   - {lf}")
-                f.write(f"\n{lf}")
-                # Optionally unstage if already staged
-                run_command(f'git reset HEAD "{lf}"', REPO_PATH, check_error=False, silent=True)
+                f.write(f"/{lf}\n")
+        # Unstage them in case they were already staged
+        run_command(["git", "reset", "-q", "HEAD", "--", *large_files], REPO_PATH, check_error=False, silent=True)
         logger.info("✅ Updated .gitignore with large files.")
+        rules = load_ignore_rules(gitignore_path)
 
-def sync_to_github():
-    """Sync local repository to GitHub with improved error handling."""
-    logger.info("🚀 Starting sync process...\n")
+    scanner.save(rules)
 
-    try:
-        # Check prerequisites
-        if not check_git_installed():
-            return False
+def list_unstaged_paths():
+    """List modified, deleted and untracked (not ignored) paths with a single git call."""
+    result = run_command(
+        ["git", "ls-files", "-z", "--modified", "--others", "--exclude-standard"],
+        REPO_PATH, check_error=False, silent=True
+    )
+    if not result or result.returncode != 0:
+        return None
+    # A modified file that is also deleted is listed twice
+    return list(dict.fromkeys(path for path in result.stdout.split("\0") if path))
 
-        if not check_network_connectivity():
-            logger.error("❌ Cannot connect to GitHub. Check your internet connection.")
-            return False
+def add_pathspecs(paths):
+    """Stage paths in one git call, passing them NUL-separated over stdin."""
+    result = run_command(
+        ["git", "--literal-pathspecs", "add", "--pathspec-from-file=-", "--pathspec-file-nul"],
+        REPO_PATH, check_error=False, silent=True, input="\0".join(paths)
+    )
+    return bool(result and result.returncode == 0)
+
+def stage_paths(paths, chunk_size=STAGE_CHUNK_SIZE):
+    """Stage paths in bounded chunks, bisecting a failed chunk down to the paths git rejects."""
+    started = time.perf_counter()
+    calls = 0
+    failed = []
+    pending = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    pending.reverse()
+    while pending:
+        chunk = pending.pop()
+        calls += 1
+        if add_pathspecs(chunk):
+            continue
+        if len(chunk) == 1:
+            failed.append(chunk[0])
+            continue
+        middle = len(chunk) // 2
+        pending.append(chunk[middle:])
+        pending.append(chunk[:middle])
 
-        # Clean up the Git repository first to fix any broken references
-        cleanup_git_repo()
+    elapsed = time.perf_counter() - started
+    staged = len(paths) - len(failed)
+    rate = staged / elapsed if elapsed > 0 else 0
+    logger.info(f"📦 Staged {staged} of {len(paths)} paths in {calls} git add calls ({elapsed:.2f}s, {rate:.0f} paths/s)")
+    for path in failed:
+        logger.warning(f"⚠️ Could not stage: {path}")
+    return failed
 
-        # Initialize repository if needed
-        if not os.path.exists(os.path.join(REPO_PATH, ".git")):
-            logger.info("🔧 Initializing Git repository...")
-            run_command("git init", REPO_PATH)
+def prepare_repository(checks):
+    """Clean up, initialize and configure the repository. Returns False when sync can't continue."""
+    # Clean up the Git repository first to fix any broken references
+    counts = cleanup_git_repo()
 
-            if not check_remote_exists():
-                logger.error(f"❌ Remote repository {REMOTE_URL} doesn't exist or is not accessible.")
-                return False
+    # Initialize repository if needed
+    if not os.path.exists(os.path.join(REPO_PATH, ".git")):
+        logger.info("🔧 Initializing Git repository...")
+        run_command(["git", "init"], REPO_PATH)
 
-            run_command(f"git remote add origin {REMOTE_URL}", REPO_PATH)
+        if checks.result("remote") is None:
+            logger.error(f"❌ Remote repository {REMOTE_URL} doesn't exist or is not accessible.")
+            return False
 
-            # Create .gitignore on first init if it doesn't exist
-            check_and_create_gitignore()
-            
-            # Apply git configs after repo is initialized
-            apply_git_configs()
-        else:
-            # Check if remote is correctly set
-            remote_check = run_command("git remote -v", REPO_PATH, silent=True)
-            
-            # Check if origin remote exists
-            origin_exists = "origin" in remote_check.stdout
-            
-            # Use set-url instead of remove+add if origin already exists
-            if origin_exists:
-                if REMOTE_URL not in remote_check.stdout:
-                    logger.info("🔄 Updating remote URL...")
-                    run_command(f"git remote set-url origin {REMOTE_URL}", REPO_PATH)
-                else:
-                    logger.info("✅ Remote URL is already correctly set")
-            else:
-                logger.info("🔄 Adding remote URL...")
-                run_command(f"git remote add origin {REMOTE_URL}", REPO_PATH)
-            
-            # Apply git configs to existing repo
-            apply_git_configs()
-            check_repo_size()
-
-        # Continue with the rest of the sync process...
-        # Check for .gitignore file and create if needed
-        gitignore_created = check_and_create_gitignore()
-        if gitignore_created:
-            logger.info("📝 Adding .gitignore to repository...")
-            run_command("git add .gitignore", REPO_PATH)
+        run_command(["git", "remote", "add", "origin", REMOTE_URL], REPO_PATH)
+
+        # Create .gitignore on first init if it doesn't exist
+        check_and_create_gitignore()
+        
+        # Apply git configs after repo is initialized
+        apply_git_configs()
+    else:
+        # Check if remote is correctly set
+        remote_check = run_command(["git", "remote", "-v"], REPO_PATH, silent=True)
         
-        # Get current branch or use default
-        current_branch = get_current_branch(REPO_PATH)
-        logger.info(f"🔍 Using branch: {current_branch}")
+        # Check if origin remote exists
+        origin_exists = "origin" in remote_check.stdout
         
-        # Check if .gitignore is being respected
-        run_command("git check-ignore --no-index --verbose .", REPO_PATH, check_error=False, silent=True)
+        # Use set-url instead of remove+add if origin already exists
+        if origin_exists:
+            if REMOTE_URL not in remote_check.stdout:
+                logger.info("🔄 Updating remote URL...")
+                run_command(["git", "remote", "set-url", "origin", REMOTE_URL], REPO_PATH)
+            else:
+                logger.info("✅ Remote URL is already correctly set")
+        else:
+            logger.info("🔄 Adding remote URL...")
+            run_command(["git", "remote", "add", "origin", REMOTE_URL], REPO_PATH)
         
-        # Auto-ignore large files BEFORE staging
-        auto_ignore_large_files()
+        # Apply git configs to existing repo
+        apply_git_configs()
+        check_repo_size(counts)
 
-        # Stage all files - respecting .gitignore
-        logger.info("📦 Staging files (respecting .gitignore)...")
+    # Check for .gitignore file and create if needed
+    gitignore_created = check_and_create_gitignore()
+    if gitignore_created:
+        logger.info("📝 Adding .gitignore to repository...")
+        run_command(["git", "add", ".gitignore"], REPO_PATH)
+
+    return True
+
+def stage_changes(scanner=None):
+    """Ignore large files, then stage everything .gitignore allows."""
+    # Auto-ignore large files BEFORE staging
+    with metrics.step("scan"):
+        auto_ignore_large_files(scanner)
+
+    # Stage all files - respecting .gitignore
+    logger.info("📦 Staging files (respecting .gitignore)...")
+    with metrics.step("stage"):
         try:
-            run_command("git add .", REPO_PATH)
+            stream_command(["git", "add", "--verbose", "."], REPO_PATH, GitProgress("📦 Staging"), silent=True)
         except GitSyncException:
             logger.warning("⚠️ Failed to add all files at once, trying batch mode...")
-            # Alternative approach for large repos - add by directory
-            for root, dirs, _ in os.walk(REPO_PATH):
-                if ".git" in root:
-                    continue
-                # Skip directories that might be in .gitignore
-                if any(d for d in [".env", "venv", "node_modules", "__pycache__"] if d in dirs):
-                    dirs[:] = [d for d in dirs if d not in [".env", "venv", "node_modules", "__pycache__"]]
-                rel_path = os.path.relpath(root, REPO_PATH)
-                if rel_path != ".":
-                    run_command(f'git add "{rel_path}"', REPO_PATH, check_error=False)
-        
-        # Check if there are changes to commit
-        if not has_changes(REPO_PATH):
-            logger.info("✅ No changes to commit")
-            return True
+            # Stage what git reports as changed in bounded chunks, isolating the paths it rejects
+            paths = list_unstaged_paths()
+            if paths is None:
+                raise
+            stage_paths(paths)
+
+def commit_changes(message=None):
+    """Commit staged changes. Returns (branch, initial, status), with branch None when there was nothing to commit."""
+    # One status snapshot drives the branch, change and upstream checks
+    status = read_status(REPO_PATH)
+    current_branch = get_current_branch(status)
+    logger.info(f"🔍 Using branch: {current_branch}")
+
+    # Check if there are changes to commit
+    if not has_changes(status):
+        logger.info("✅ No changes to commit")
+        return None, False, status
+
+    # Create initial commit if needed
+    if not status.has_commits:
+        logger.info("📝 Creating initial commit...")
+        run_command(["git", "commit", "-m", "📦 Initial commit"], REPO_PATH)
+        return current_branch, True, status
+
+    # Commit changes
+    logger.info("📝 Committing changes...")
+    run_command(["git", "commit", "-m", message or commit_message()], REPO_PATH)
+    return current_branch, False, status
+
+def push_changes(current_branch, initial, status=None, remote_heads=None, has_auth=check_auth_setup):
+    """Pull and push the branch. Returns True when the remote is up to date."""
+    if initial:
+        # For initial commit, don't try to pull since the branch doesn't exist remotely yet
+        logger.info("⬆️ Pushing initial commit to GitHub...")
+        with metrics.step("push"):
+            stream_command(["git", "push", "--progress", "--set-upstream", "origin", current_branch], REPO_PATH,
+                           GitProgress("⬆️ Push"), check_error=False)
+        return True
+
+    # Check if branch exists on remote before pulling
+    if check_remote_branch(current_branch, status, remote_heads):
+        # Pull before pushing to avoid conflicts
+        logger.info("⬇️ Pulling latest changes from remote...")
+        with metrics.step("pull"):
+            pull_result = stream_command(["git", "pull", "--progress", "--no-edit", "origin", current_branch], REPO_PATH,
+                                         GitProgress("⬇️ Pull"), check_error=False)
         
-        # Create initial commit if needed
-        has_any_commits = run_command("git rev-parse --verify HEAD", REPO_PATH, check_error=False, silent=True)
-        if not has_any_commits or has_any_commits.returncode != 0:
-            logger.info("📝 Creating initial commit...")
-            run_command('git commit -m "📦 Initial commit"', REPO_PATH)
+        # Check for merge conflicts
+        if pull_result and "CONFLICT" in pull_result.stdout + pull_result.stderr:
+            logger.error("❌ Merge conflicts detected! Resolve conflicts manually before syncing.")
+            run_command(["git", "merge", "--abort"], REPO_PATH, check_error=False)
+            return False
+    else:
+        # Branch doesn't exist remotely yet, don't try to pull
+        # This message is already logged in check_remote_branch()
+        pass
+    
+    # Push changes (force overwrite remote)
+    logger.info("⬆️ Force pushing to GitHub (overwriting remote)...")
+    with metrics.step("push"):
+        push_result = stream_command(["git", "push", "--progress", "--force", "origin", current_branch], REPO_PATH,
+                                     GitProgress("⬆️ Push"), check_error=False)
+    
+    # Handle authentication issues
+    if push_result and push_result.returncode != 0:
+        if "Authentication failed" in push_result.stderr:
+            logger.error("❌ GitHub authentication failed!")
+            if not has_auth():
+                logger.info("💡 Tip: Set up credential helper with: git config --global credential.helper cache")
+            return False
             
-            # For initial commit, don't try to pull since the branch doesn't exist remotely yet
-            logger.info("⬆️ Pushing initial commit to GitHub...")
-            run_command(f"git push --set-upstream origin {current_branch}", REPO_PATH, check_error=False)
+        # Try pushing with --set-upstream for new branches
+        if "has no upstream branch" in push_result.stderr:
+            logger.info(f"🔄 Setting upstream for branch {current_branch}...")
+            with metrics.step("push"):
+                stream_command(["git", "push", "--progress", "--set-upstream", "origin", current_branch], REPO_PATH,
+                               GitProgress("⬆️ Push"))
         else:
-            # Commit changes
-            logger.info("📝 Committing changes...")
-            run_command(f'git commit -m "{COMMIT_MESSAGE}"', REPO_PATH)
-            
-            # Check if branch exists on remote before pulling
-            if check_remote_branch(current_branch):
-                # Pull before pushing to avoid conflicts
-                logger.info("⬇️ Pulling latest changes from remote...")
-                pull_result = run_command(f"git pull --no-edit origin {current_branch}", REPO_PATH, check_error=False)
-                
-                # Check for merge conflicts
-                if pull_result and "CONFLICT" in pull_result.stdout + pull_result.stderr:
-                    logger.error("❌ Merge conflicts detected! Resolve conflicts manually before syncing.")
-                    run_command("git merge --abort", REPO_PATH, check_error=False)
-                    return False
-            else:
-                # Branch doesn't exist remotely yet, don't try to pull
-                # This message is already logged in check_remote_branch()
-                pass
-            
-            # Push changes (force overwrite remote)
-            logger.info("⬆️ Force pushing to GitHub (overwriting remote)...")
-            push_result = run_command(f"git push --force origin {current_branch}", REPO_PATH, check_error=False)
-            
-            # Handle authentication issues
-            if push_result and push_result.returncode != 0:
-                if "Authentication failed" in push_result.stderr:
-                    logger.error("❌ GitHub authentication failed!")
-                    if not check_auth_setup():
-                        logger.info("💡 Tip: Set up credential helper with: git config --global credential.helper cache")
-                    return False
-                    
-                # Try pushing with --set-upstream for new branches
-                if "has no upstream branch" in push_result.stderr:
-                    logger.info(f"🔄 Setting upstream for branch {current_branch}...")
-                    run_command(f"git push --set-upstream origin {current_branch}", REPO_PATH)
-                else:
-                    logger.error(f"❌ Push failed: {push_result.stderr.strip()}")
-                    return False
+            logger.error(f"❌ Push failed: {push_result.stderr.strip()}")
+            return False
+
+    return True
+
+def sync_to_github():
+    """Sync local repository to GitHub, recording per-step timings."""
+    global metrics
+    metrics = SyncMetrics("sync")
+    result = False
+    try:
+        result = run_sync()
+        return result
+    finally:
+        metrics.finish(result)
+
+def run_sync():
+    """Sync local repository to GitHub with improved error handling."""
+    logger.info("🚀 Starting sync process...\n")
+
+    # Network probes run in the background; local preparation and staging don't wait for them
+    checks = PrerequisiteChecks()
+    try:
+        # Check prerequisites
+        if not checks.result("git", False):
+            return False
+
+        with metrics.step("cleanup"):
+            if not prepare_repository(checks):
+                return False
+
+        stage_changes()
+
+        # Everything past this point needs GitHub
+        if not checks.result("network", False):
+            logger.error("❌ Cannot connect to GitHub. Check your internet connection.")
+            return False
+
+        with metrics.step("commit"):
+            current_branch, initial, status = commit_changes()
+        if current_branch is None:
+            return True
+
+        if not push_changes(current_branch, initial, status, checks.result("remote"), lambda: checks.result("auth", False)):
+            return False
                 
         logger.info("\n✅ Sync to GitHub complete!")
         return True
@@ -400,31 +960,22 @@ def sync_to_github():
     except Exception as e:
         logger.error(f"❌ Unexpected error: {str(e)}")
         return False
+    finally:
+        checks.close()
 
 def cleanup_git_repo():
-    # Remove .git/refs/desktop.ini directly if it exists
-    direct_ref_file = os.path.join(REPO_PATH, ".git", "refs", "desktop.ini")
-    if os.path.exists(direct_ref_file):
-        try:
-            os.remove(direct_ref_file)
-            logger.info(f"✅ Removed direct broken ref file: {direct_ref_file}")
-        except Exception as e:
-            logger.warning(f"⚠️ Could not remove direct broken ref file {direct_ref_file}: {str(e)}")
     """Clean up Git repository if it's in a bad state."""
     logger.info("🧹 Cleaning up Git repository...")
-    
 
-    # Remove garbage files like desktop.ini and tmp_pack_* from .git/objects and .git/objects/pack
-    objects_dir = os.path.join(REPO_PATH, ".git", "objects")
-    for root, dirs, files in os.walk(objects_dir):
-        for file in files:
-            if file.lower() == "desktop.ini" or file.startswith("tmp_pack") or not all(c in "0123456789abcdefpack" for c in file.lower().replace(".pack", "").replace(".idx", "")):
-                file_path = os.path.join(root, file)
-                try:
-                    os.remove(file_path)
-                    logger.info(f"✅ Removed garbage file: {file_path}")
-                except Exception as e:
-                    logger.warning(f"⚠️ Could not remove garbage file {file_path}: {str(e)}")
+    # Remove desktop.ini files Windows drops into .git, which git reports as broken refs or objects
+    for direct_file in (os.path.join(REPO_PATH, ".git", "refs", "desktop.ini"),
+                        os.path.join(REPO_PATH, ".git", "objects", "desktop.ini")):
+        if os.path.exists(direct_file):
+            try:
+                os.remove(direct_file)
+                logger.info(f"✅ Removed broken file: {direct_file}")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not remove broken file {direct_file}: {str(e)}")
 
     # Remove garbage files like desktop.ini from .git/refs and subfolders
     refs_dir = os.path.join(REPO_PATH, ".git", "refs")
@@ -437,9 +988,6 @@ def cleanup_git_repo():
                     logger.info(f"✅ Removed garbage ref file: {file_path}")
                 except Exception as e:
                     logger.warning(f"⚠️ Could not remove garbage ref file {file_path}: {str(e)}")
-
-    # Clean up garbage objects (run after manual cleanup)
-    run_command("git gc --prune=now", REPO_PATH, check_error=False, silent=True)
     
     # Remove any index.lock file if it exists (from interrupted git operations)
     git_lock_file = os.path.join(REPO_PATH, ".git", "index.lock")
@@ -454,7 +1002,7 @@ def cleanup_git_repo():
     logger.info("🔧 Checking for broken references...")
     try:
         # List all remote refs
-        refs_result = run_command("git for-each-ref refs/remotes/origin/", REPO_PATH, check_error=False, silent=True)
+        refs_result = run_command(["git", "for-each-ref", "refs/remotes/origin/"], REPO_PATH, check_error=False, silent=True)
         if refs_result and refs_result.returncode == 0:
             for line in refs_result.stdout.splitlines():
                 if "desktop.ini" in line or "Thumbs.db" in line:
@@ -471,22 +1019,114 @@ def cleanup_git_repo():
     except Exception as e:
         logger.warning(f"⚠️ Error checking for broken references: {str(e)}")
     
-    return True
+    # Pack only when the object store actually needs it; the counts are reused for the size check
+    return run_maintenance()
+
+def count_objects():
+    """Read `git count-objects -v` as a dict of ints plus the garbage paths git reports."""
+    result = run_command(["git", "count-objects", "-v"], REPO_PATH, check_error=False, silent=True)
+    if not result or result.returncode != 0:
+        return None
+    counts = {"garbagePaths": []}
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition(":")
+        try:
+            counts[key.strip()] = int(value.strip())
+        except ValueError:
+            continue
+    for line in result.stderr.splitlines():
+        if "garbage found:" in line:
+            counts["garbagePaths"].append(line.split("garbage found:", 1)[1].strip())
+    return counts
 
-def check_repo_size():
+def load_maintenance_state():
+    try:
+        with open(MAINTENANCE_STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"lastRun": {}}
+
+def save_maintenance_state(state):
+    tmp_path = f"{MAINTENANCE_STATE_PATH}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, MAINTENANCE_STATE_PATH)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not save maintenance state: {str(e)}")
+
+def remove_object_garbage(paths):
+    """Remove only garbage git itself reported that is known to be safe to delete."""
+    cutoff = time.time() - MAINTENANCE_THRESHOLDS["garbageAgeMinutes"] * 60
+    for path in paths:
+        file_path = os.path.join(REPO_PATH, path)
+        name = os.path.basename(file_path).lower()
+        try:
+            if name == "desktop.ini" or (name.startswith("tmp_") and os.path.getmtime(file_path) < cutoff):
+                os.remove(file_path)
+                logger.info(f"✅ Removed garbage file: {file_path}")
+        except OSError as e:
+            logger.warning(f"⚠️ Could not remove garbage file {file_path}: {str(e)}")
+
+def run_maintenance(counts=None):
+    """Run the maintenance tasks whose thresholds are crossed and record when each ran."""
+    if not os.path.isdir(os.path.join(REPO_PATH, ".git")):
+        return None
+    counts = counts or count_objects()
+    if counts is None:
+        return None
+
+    state = load_maintenance_state()
+    last_run = state.setdefault("lastRun", {})
+    now = time.time()
+    min_interval = MAINTENANCE_THRESHOLDS["minIntervalMinutes"] * 60
+
+    def due(task):
+        return now - last_run.get(task, 0) >= min_interval
+
+    tasks = []
+    if counts["garbagePaths"]:
+        remove_object_garbage(counts["garbagePaths"])
+    if counts.get("count", 0) >= MAINTENANCE_THRESHOLDS["looseObjects"] and due("looseObjects"):
+        tasks.append(("looseObjects", [
+            ["git", "repack", "-d", "-q"],
+            ["git", "prune-packed", "-q"],
+            # Same expiry git gc uses, so objects a concurrent operation just wrote are kept
+            ["git", "prune", "--expire=2.weeks.ago"]
+        ]))
+    if counts.get("packs", 0) >= MAINTENANCE_THRESHOLDS["packs"] and due("incrementalRepack"):
+        tasks.append(("incrementalRepack", [["git", "repack", "-d", "-l", "-q", "--geometric=2"]]))
+    if now - last_run.get("commitGraph", 0) >= MAINTENANCE_THRESHOLDS["commitGraphHours"] * 3600:
+        tasks.append(("commitGraph", [["git", "commit-graph", "write", "--reachable", "--split"]]))
+
+    for task, commands in tasks:
+        logger.info(f"🧹 Running maintenance task: {task}")
+        ok = True
+        for command in commands:
+            result = run_command(command, REPO_PATH, check_error=False, silent=True)
+            if not result or result.returncode != 0:
+                # --geometric needs git 2.33+; fall back to a full local repack
+                if task == "incrementalRepack":
+                    result = run_command(["git", "repack", "-a", "-d", "-l", "-q"], REPO_PATH, check_error=False, silent=True)
+                ok = bool(result and result.returncode == 0)
+        if ok:
+            last_run[task] = now
+
+    state["lastCheck"] = now
+    state["counts"] = {key: value for key, value in counts.items() if key != "garbagePaths"}
+    save_maintenance_state(state)
+    return counts
+
+def check_repo_size(counts=None):
     """Check if repository is getting too large."""
     try:
-        result = run_command("git count-objects -v", REPO_PATH, silent=True)
-        if result and result.returncode == 0:
-            # Extract size-pack value (in KB)
-            lines = result.stdout.strip().split('\n')
-            for line in lines:
-                if line.startswith('size-pack:'):
-                    size_kb = int(line.split(':')[1].strip())
-                    size_mb = size_kb / 1024
-                    if size_mb > 500:  # Warning if over 500MB
-                        logger.warning(f"⚠️ Repository size is large: {size_mb:.2f} MB")
-                        logger.warning("Consider using Git LFS for large binary files: https://git-lfs.github.com")
+        counts = counts or count_objects()
+        if counts:
+            # size-pack is reported in KB
+            size_mb = counts.get("size-pack", 0) / 1024
+            if size_mb > 500:  # Warning if over 500MB
+                logger.warning(f"⚠️ Repository size is large: {size_mb:.2f} MB")
+                logger.warning("Consider using Git LFS for large binary files: https://git-lfs.github.com")
     except:
         pass  # Silently fail if we can't check size
 
@@ -494,7 +1134,7 @@ def get_gitignore_status():
     """Get a report on what files are being ignored by .gitignore."""
     try:
         # Get list of ignored files
-        ignored_files = run_command("git status --ignored --porcelain", REPO_PATH, check_error=False, silent=True)
+        ignored_files = run_command(["git", "status", "--ignored", "--porcelain"], REPO_PATH, check_error=False, silent=True)
         if ignored_files and ignored_files.stdout:
             ignored_list = []
             for line in ignored_files.stdout.splitlines():
@@ -513,11 +1153,16 @@ def get_gitignore_status():
     except Exception as e:
         logger.error(f"❌ Error checking .gitignore: {str(e)}")
 
-def check_remote_branch(branch_name):
+def check_remote_branch(branch_name, status=None, remote_heads=None):
     """Check if branch exists on remote and handle correctly."""
-    # Try direct check first (fast)
-    result = run_command(f"git ls-remote --heads origin {branch_name}", REPO_PATH, check_error=False, silent=True)
-    branch_exists = result and result.returncode == 0 and result.stdout.strip() != ""
+    # Prefer the heads already listed by the prerequisite probe, then a tracked upstream in the status snapshot
+    if remote_heads is not None:
+        branch_exists = branch_name in remote_heads
+    elif status is not None and status.upstream == f"origin/{branch_name}":
+        branch_exists = True
+    else:
+        result = run_command(["git", "ls-remote", "--heads", "origin", branch_name], REPO_PATH, check_error=False, silent=True)
+        branch_exists = result and result.returncode == 0 and result.stdout.strip() != ""
     
     if branch_exists:
         logger.info(f"✅ Remote branch '{branch_name}' exists")
@@ -529,9 +1174,9 @@ def check_remote_branch(branch_name):
 def list_remote_branches():
     """Get a list of all known remote branches."""
     # First, make sure we have latest remote info
-    run_command("git fetch --prune", REPO_PATH, check_error=False, silent=True)
+    run_command(["git", "fetch", "--prune"], REPO_PATH, check_error=False, silent=True)
     
-    result = run_command("git branch -r", REPO_PATH, check_error=False, silent=True)
+    result = run_command(["git", "branch", "-r"], REPO_PATH, check_error=False, silent=True)
     if result and result.returncode == 0:
         branches = []
         for line in result.stdout.splitlines():
@@ -541,38 +1186,307 @@ def list_remote_branches():
         return branches
     return []
 
+class PollingWatcher:
+    """Detect changes by comparing file mtimes and sizes between polls"""
+
+    def __init__(self, root, rules, interval=WATCH_POLL_SECONDS):
+        self.root = root
+        self.rules = rules
+        self.interval = interval
+
+    def snapshot(self):
+        files = {}
+        rules = self.rules()
+        stack = [("", self.root)]
+        while stack:
+            rel, path = stack.pop()
+            try:
+                with os.scandir(path) as it:
+                    for item in it:
+                        child_rel = f"{rel}/{item.name}" if rel else item.name
+                        if item.name == ".git" or is_ignored(child_rel, rules):
+                            continue
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                stack.append((child_rel, item.path))
+                            else:
+                                st = item.stat(follow_symlinks=False)
+                                files[child_rel] = (st.st_mtime_ns, st.st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return files
+
+    async def run(self, notify):
+        previous = await asyncio.to_thread(self.snapshot)
+        while True:
+            await asyncio.sleep(self.interval)
+            current = await asyncio.to_thread(self.snapshot)
+            if current != previous:
+                notify()
+            previous = current
+
+class InotifyWatcher:
+    """Linux inotify through ctypes, one watch per directory that .gitignore doesn't prune"""
+
+    # IN_CLOSE_WRITE rather than IN_MODIFY, so a file being streamed to wakes us once, not per write
+    MASK = 0x8 | 0x40 | 0x80 | 0x100 | 0x200 | 0x400 | 0x800
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, root, rules):
+        self.root = root
+        self.rules = rules
+        self.paths = {}
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        # IN_NONBLOCK | IN_CLOEXEC
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | 0o2000000)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            self.watch_tree("", root)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    @staticmethod
+    def available():
+        return sys.platform.startswith("linux") and bool(ctypes.util.find_library("c"))
+
+    def watch_tree(self, rel, path):
+        """Add watches for path and every non-ignored directory below it."""
+        rules = self.rules()
+        stack = [(rel, path)]
+        while stack:
+            rel, path = stack.pop()
+            wd = self._add_watch(self.fd, os.fsencode(path), self.MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == 28:
+                    # ENOSPC: fs.inotify.max_user_watches is too low for this tree
+                    raise OSError(error, "inotify watch limit reached")
+                continue
+            self.paths[wd] = rel
+            try:
+                with os.scandir(path) as it:
+                    for item in it:
+                        child_rel = f"{rel}/{item.name}" if rel else item.name
+                        if item.name != ".git" and item.is_dir(follow_symlinks=False) and not is_ignored(child_rel, rules):
+                            stack.append((child_rel, item.path))
+            except OSError:
+                continue
+
+    def _read_events(self, notify):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        rules = self.rules()
+        changed = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            name = data[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b"\0")
+            offset += self.EVENT.size + length
+            if mask & self.IN_Q_OVERFLOW:
+                changed = True
+                continue
+            if mask & self.IN_IGNORED:
+                self.paths.pop(wd, None)
+                continue
+            parent = self.paths.get(wd)
+            if parent is None:
+                continue
+            name = os.fsdecode(name)
+            rel = f"{parent}/{name}" if parent and name else (name or parent)
+            if name == ".git" or (rel and is_ignored(rel, rules)):
+                continue
+            if mask & self.IN_ISDIR and mask & (0x80 | 0x100):
+                try:
+                    self.watch_tree(rel, os.path.join(self.root, rel))
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not watch {rel}: {str(e)}")
+            changed = True
+        if changed:
+            notify()
+
+    async def run(self, notify):
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self.fd, self._read_events, notify)
+        try:
+            await asyncio.Future()
+        finally:
+            loop.remove_reader(self.fd)
+            os.close(self.fd)
+
+class SyncDaemon:
+    """Long-running --watch mode: commit debounced bursts of changes and coalesce pushes"""
+
+    def __init__(self, debounce=WATCH_DEBOUNCE_SECONDS, push_interval=WATCH_PUSH_INTERVAL_SECONDS,
+                 poll_interval=WATCH_POLL_SECONDS):
+        self.debounce = debounce
+        self.push_interval = push_interval
+        self.poll_interval = poll_interval
+        self.gitignore_path = os.path.join(REPO_PATH, ".gitignore")
+        # State kept between cycles instead of being rediscovered by every run
+        self.scanner = LargeFileScanner(REPO_PATH, LARGE_FILE_THRESHOLD_MB * 1024 * 1024)
+        self.remote_heads = None
+        self._rules = []
+        self._rules_mtime = None
+        self._last_push = None
+
+    def rules(self):
+        """Ignore rules, re-read only when .gitignore changes."""
+        try:
+            mtime = os.stat(self.gitignore_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._rules_mtime:
+            self._rules = load_ignore_rules(self.gitignore_path)
+            self._rules_mtime = mtime
+        return self._rules
+
+    def watcher(self):
+        if InotifyWatcher.available():
+            try:
+                watcher = InotifyWatcher(REPO_PATH, self.rules)
+                logger.info(f"👀 Watching {len(watcher.paths)} directories with inotify")
+                return watcher
+            except OSError as e:
+                logger.warning(f"⚠️ inotify unavailable ({str(e)}), falling back to polling")
+        logger.info(f"👀 Polling for changes every {self.poll_interval}s")
+        return PollingWatcher(REPO_PATH, self.rules, self.poll_interval)
+
+    def commit_cycle(self):
+        """Stage and commit; returns True when a commit was made."""
+        global metrics
+        metrics = SyncMetrics("watch-commit")
+        committed = False
+        try:
+            stage_changes(self.scanner)
+            with metrics.step("commit"):
+                current_branch, initial, _ = commit_changes()
+            committed = current_branch is not None
+        except GitSyncException as e:
+            logger.error(f"❌ Commit failed: {str(e)}")
+        finally:
+            metrics.finish(committed)
+        return committed
+
+    def push_cycle(self):
+        """Push everything committed since the last push; returns False to retry later."""
+        global metrics
+        metrics = SyncMetrics("watch-push")
+        pushed = False
+        try:
+            with metrics.step("prereqs"):
+                online = check_network_connectivity(CHECK_TIMEOUTS["network"])
+            if not online:
+                logger.warning("⚠️ Cannot connect to GitHub, will retry")
+                return False
+            status = read_status(REPO_PATH)
+            current_branch = get_current_branch(status)
+            if not push_changes(current_branch, False, status, self.remote_heads):
+                return False
+            pushed = True
+            if self.remote_heads is not None:
+                self.remote_heads.add(current_branch)
+            logger.info("✅ Sync to GitHub complete!")
+            with metrics.step("cleanup"):
+                run_maintenance()
+            return True
+        except GitSyncException as e:
+            logger.error(f"❌ Push failed: {str(e)}")
+            return False
+        finally:
+            metrics.finish(pushed)
+
+    async def _settle(self, changed):
+        """Return once no change has arrived for the debounce period."""
+        while True:
+            changed.clear()
+            try:
+                await asyncio.wait_for(changed.wait(), self.debounce)
+            except asyncio.TimeoutError:
+                return
+
+    async def _pusher(self, push_requested, git_lock):
+        loop = asyncio.get_running_loop()
+        while True:
+            await push_requested.wait()
+            if self._last_push is not None:
+                delay = self._last_push + self.push_interval - loop.time()
+                if delay > 0:
+                    logger.info(f"⏳ Next push in {delay:.0f}s")
+                    await asyncio.sleep(delay)
+            # Commits made while waiting ride along with this push
+            push_requested.clear()
+            async with git_lock:
+                pushed = await asyncio.to_thread(self.push_cycle)
+            self._last_push = loop.time()
+            if not pushed:
+                push_requested.set()
+
+    async def run(self):
+        logger.info("🚀 Starting watch mode...\n")
+        checks = PrerequisiteChecks()
+        try:
+            if not checks.result("git", False):
+                return False
+            if not await asyncio.to_thread(prepare_repository, checks):
+                return False
+            self.remote_heads = checks.result("remote")
+        finally:
+            checks.close()
+
+        changed = asyncio.Event()
+        push_requested = asyncio.Event()
+        git_lock = asyncio.Lock()
+        tasks = [
+            asyncio.create_task(self.watcher().run(changed.set)),
+            asyncio.create_task(self._pusher(push_requested, git_lock))
+        ]
+        # The first cycle picks up whatever changed while nothing was watching
+        changed.set()
+        try:
+            while True:
+                await changed.wait()
+                await self._settle(changed)
+                async with git_lock:
+                    committed = await asyncio.to_thread(self.commit_cycle)
+                if committed:
+                    push_requested.set()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if push_requested.is_set():
+                logger.warning("⚠️ Stopping with unpushed commits; the next sync will push them")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sync this repository to GitHub")
+    parser.add_argument("--watch", action="store_true", help="keep running and sync whenever the working tree changes")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE_SECONDS, help="seconds of quiet before committing a burst of changes")
+    parser.add_argument("--push-interval", type=float, default=WATCH_PUSH_INTERVAL_SECONDS, help="minimum seconds between pushes in watch mode")
+    parser.add_argument("--poll-interval", type=float, default=WATCH_POLL_SECONDS, help="seconds between polls where inotify is unavailable")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        # Install tqdm if needed
-        try:
-            from tqdm import tqdm
-            
-            # Run the sync process (moved before progress display)
-            sync_result = sync_to_github()
-            
-            # Use tqdm for visual feedback after the fact
-            steps = [
-                "Prerequisites checked",
-                "Repository prepared",
-                "Files staged",
-                "Changes committed",
-                "Remote synced",
-                "Push completed"
-            ]
-            
-            with tqdm(steps, desc="🔄 Completed", ncols=80) as progress:
-                for _ in progress:
-                    sleep(0.1)
-            
-            # If sync was successful, show gitignore status
-            if sync_result:
-                get_gitignore_status()
-            
-        except ImportError:
-            logger.warning("⚠️ tqdm not installed, running without progress bar")
-            sync_result = sync_to_github()
-            if sync_result:
-                get_gitignore_status()
+        if args.watch:
+            daemon = SyncDaemon(args.debounce, args.push_interval, args.poll_interval)
+            sys.exit(0 if asyncio.run(daemon.run()) is not False else 1)
+
+        sync_result = sync_to_github()
+
+        # If sync was successful, show gitignore status
+        if sync_result:
+            get_gitignore_status()
     except KeyboardInterrupt:
         logger.info("\n⚠️ Sync interrupted by user")
     except Exception as e:
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# benchmark-dmg-vendor.py
+# Benchmarks for the Python libraries vendored by dmg-builder
+#
+# Usage:
+#   benchmark-dmg-vendor.py                                   Default suites and sizes
+#   benchmark-dmg-vendor.py --suites plist-write --sizes 10k,100k,500k
+#   benchmark-dmg-vendor.py --suites ds-store-update,ds-store-update-uncached
+#   benchmark-dmg-vendor.py --suites ds-store-update,ds-store-update-many,ds-store-update-many-incremental
+#   benchmark-dmg-vendor.py --suites bookmark-read,bookmark-read-lazy,bookmark-read-many
+#   benchmark-dmg-vendor.py --report report.json              Save a machine-readable report
+#
+# Sizes are object counts with k/m suffixes (plist objects, .DS_Store records
+# written, or bookmarks parsed); each suite has its own default sizes. Inputs come from a
+# seeded generator, so reports made with the same seed and sizes are
+# comparable. Each suite prints time per object next to the absolute time; a
+# flat per-object column means the operation scales linearly. The io column
+# counts read/write/seek calls on the underlying file.
+
+import sys
+import io
+import os
+import json
+import time
+import random
+import struct
+import tempfile
+import argparse
+import platform
+import statistics
+from datetime import datetime, timezone
+
+VENDOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'node_modules', 'dmg-builder',
+                           'vendor')
+sys.path.insert(0, VENDOR_PATH)
+
+import biplist  # noqa: E402
+import mac_alias  # noqa: E402
+from ds_store import DSStore, DSStoreEntry  # noqa: E402
+
+REPORT_VERSION = 1
+DEFAULT_SUITES = ('plist-write,plist-read,plist-read-lazy,ds-store-update,ds-store-update-uncached,'
+                  'ds-store-update-many,ds-store-update-many-incremental,bookmark-read,bookmark-read-lazy,'
+                  'bookmark-read-many')
+
+FINDER_KEYS = ['ShowStatusBar', 'WindowBounds', 'ContainerShowSidebar', 'PreviewPaneVisibility',
+               'ShowToolbar', 'SidebarWidth', 'ViewStyle', 'backgroundType', 'iconSize', 'textSize',
+               'gridSpacing', 'labelOnBottom', 'arrangeBy', 'showIconPreview', 'showItemInfo']
+
+
+def parse_count(text):
+    """Parse 100, 10k or 1m."""
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def build_plist(objects, seed):
+    """Build a Finder/bookmark-like plist with roughly `objects` plist objects."""
+    generator = random.Random(seed)
+    root = {}
+    count = 0
+    index = 0
+    while count < objects:
+        entry = {
+            'name': 'Item %d' % index,
+            'position': [generator.randint(0, 2000), generator.randint(0, 2000)],
+            'size': generator.randint(0, 1 << 40),
+            'modified': datetime(2020, 1, 1) + (datetime(2024, 1, 1) - datetime(2020, 1, 1)) * generator.random(),
+            'alias': biplist.Data(bytes(generator.getrandbits(8) for _ in range(24))),
+            'flags': generator.choice([True, False]),
+            # Shared values exercise object uniquing
+            generator.choice(FINDER_KEYS): generator.choice(FINDER_KEYS),
+        }
+        root['entry-%d' % index] = entry
+        # Key, dict, 7 keys, 7 values (mostly unique), 2 position ints
+        count += 17
+        index += 1
+    return root
+
+
+def timed(function, repeats):
+    samples = []
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def bench_plist_write(size, seed, repeats):
+    plist = build_plist(size, seed)
+    seconds, data = timed(lambda: biplist.writePlistToString(plist), repeats)
+    return seconds, {'bytes': len(data)}
+
+
+def bench_plist_read(size, seed, repeats, lazy=False):
+    data = biplist.writePlistToString(build_plist(size, seed))
+    probe = 'entry-%d' % (size // 34)
+
+    def read():
+        plist = biplist.readPlistFromString(data, lazy=lazy)
+        return plist[probe]['name']
+
+    seconds, _ = timed(read, repeats)
+    return seconds, {'bytes': len(data)}
+
+
+class CountingFile(io.FileIO):
+    """File that counts the calls which turn into system calls."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.calls = 0
+
+    def read(self, *args):
+        self.calls += 1
+        return super().read(*args)
+
+    def write(self, data):
+        self.calls += 1
+        return super().write(data)
+
+    def seek(self, *args):
+        self.calls += 1
+        return super().seek(*args)
+
+
+def bench_ds_store_update(size, seed, repeats, cache_blocks=None, batch=None):
+    """Create a .DS_Store the way Finder fills one: an icon position per file, then a comment on each.
+
+    batch=None writes one record at a time; 'auto' and 'incremental' pass each round to update_many().
+    """
+    generator = random.Random(seed)
+    names = ['File %06d %s.png' % (index, 'x' * generator.randint(0, 30)) for index in range(size // 2)]
+    generator.shuffle(names)
+    options = {} if cache_blocks is None else {'cache_blocks': cache_blocks}
+    calls = []
+
+    def update():
+        with tempfile.TemporaryDirectory() as directory:
+            with CountingFile(os.path.join(directory, '.DS_Store'), 'w+') as f:
+                with DSStore.open(f, 'w+', **options) as store:
+                    if batch is None:
+                        for index, name in enumerate(names):
+                            store[name]['Iloc'] = (index % 1000, index // 1000)
+                        for name in names:
+                            store[name]['cmmt'] = ('ustr', name.upper())
+                    else:
+                        rebuild = None if batch == 'auto' else False
+                        store.update_many([DSStoreEntry(name, 'Iloc', 'blob', struct.pack('>IIII', index % 1000,
+                                                                                         index // 1000, 0xffffffff,
+                                                                                         0xffff0000))
+                                           for index, name in enumerate(names)], rebuild=rebuild)
+                        store.update_many([DSStoreEntry(name, 'cmmt', 'ustr', name.upper()) for name in names],
+                                          rebuild=rebuild)
+                calls.append(f.calls)
+
+    seconds, _ = timed(update, repeats)
+    return seconds, {'io': calls[-1]}
+
+
+def build_bookmarks(count, seed):
+    """Build `count` encoded bookmarks shaped like Bookmark.for_file() output, for files in a few folders."""
+    generator = random.Random(seed)
+    volume_created = datetime(2021, 6, 1, tzinfo=timezone.utc)
+    volume_uuid = '%08X-0000-0000-0000-000000000000' % generator.getrandbits(32)
+    volume_props = mac_alias.Data(struct.pack('<QQQ', 0x81, 0x13ef, 0))
+    result = []
+    for index in range(count):
+        folder = ['Users', 'builder', 'Projects', 'folder-%d' % generator.randint(0, 20)]
+        name_path = folder + ['File %06d.png' % index]
+        toc = {
+            mac_alias.kBookmarkPath: name_path,
+            mac_alias.kBookmarkCNIDPath: [2 + depth for depth in range(len(folder))] + [1000 + index],
+            mac_alias.kBookmarkFileCreationDate: volume_created + (datetime(2024, 1, 1, tzinfo=timezone.utc)
+                                                                  - volume_created) * generator.random(),
+            mac_alias.kBookmarkFileProperties: mac_alias.Data(struct.pack('<QQQ', 1, 0x0f, 0)),
+            mac_alias.kBookmarkContainingFolder: len(name_path) - 2,
+            mac_alias.kBookmarkVolumePath: '/',
+            mac_alias.kBookmarkVolumeIsRoot: True,
+            mac_alias.kBookmarkVolumeURL: mac_alias.URL('file:///'),
+            mac_alias.kBookmarkVolumeName: 'Macintosh HD',
+            mac_alias.kBookmarkVolumeSize: 500107862016,
+            mac_alias.kBookmarkVolumeCreationDate: volume_created,
+            mac_alias.kBookmarkVolumeUUID: volume_uuid,
+            mac_alias.kBookmarkVolumeProperties: volume_props,
+            mac_alias.kBookmarkCreationOptions: 512,
+            mac_alias.kBookmarkWasFileReference: True,
+            mac_alias.kBookmarkUserName: 'builder',
+            mac_alias.kBookmarkUID: 501,
+        }
+        result.append(mac_alias.Bookmark([(1, toc)]).to_bytes())
+    return result
+
+
+def bench_bookmark_read(size, seed, repeats, lazy=False, many=False):
+    """Parse `size` bookmarks and look up the path of each, one at a time or as a batch."""
+    datas = build_bookmarks(size, seed)
+
+    def read():
+        if many:
+            bookmarks = mac_alias.Bookmark.from_bytes_many(datas, lazy=lazy)
+        else:
+            bookmarks = [mac_alias.Bookmark.from_bytes(data, lazy=lazy) for data in datas]
+        return [bookmark[mac_alias.kBookmarkPath] for bookmark in bookmarks]
+
+    seconds, _ = timed(read, repeats)
+    return seconds, {'bytes': sum(len(data) for data in datas)}
+
+
+SUITES = {
+    'plist-write': (bench_plist_write, '10k,50k,100k,250k,500k'),
+    'plist-read': (bench_plist_read, '10k,50k,100k,250k,500k'),
+    'plist-read-lazy': (lambda size, seed, repeats: bench_plist_read(size, seed, repeats, lazy=True),
+                        '10k,50k,100k,250k,500k'),
+    'ds-store-update': (bench_ds_store_update, '1k,4k,16k'),
+    'ds-store-update-uncached': (lambda size, seed, repeats: bench_ds_store_update(size, seed, repeats, 0),
+                                 '1k,4k,16k'),
+    'ds-store-update-many': (lambda size, seed, repeats: bench_ds_store_update(size, seed, repeats, batch='auto'),
+                             '1k,4k,16k,64k'),
+    'ds-store-update-many-incremental': (
+        lambda size, seed, repeats: bench_ds_store_update(size, seed, repeats, batch='incremental'), '1k,4k,16k'),
+    'bookmark-read': (bench_bookmark_read, '1k,10k,50k'),
+    'bookmark-read-lazy': (lambda size, seed, repeats: bench_bookmark_read(size, seed, repeats, lazy=True),
+                           '1k,10k,50k'),
+    'bookmark-read-many': (lambda size, seed, repeats: bench_bookmark_read(size, seed, repeats, many=True),
+                           '1k,10k,50k'),
+    'bookmark-read-many-lazy': (
+        lambda size, seed, repeats: bench_bookmark_read(size, seed, repeats, lazy=True, many=True), '1k,10k,50k'),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the dmg-builder vendored Python libraries')
+    parser.add_argument('--suites', default=DEFAULT_SUITES, help='comma-separated suites: ' + ', '.join(SUITES))
+    parser.add_argument('--sizes', help='comma-separated object counts (default: per suite)')
+    parser.add_argument('--repeats', type=int, default=3, help='runs per measurement (median is reported)')
+    parser.add_argument('--seed', type=int, default=1, help='generator seed')
+    parser.add_argument('--report', help='write a JSON report to this file')
+    args = parser.parse_args()
+
+    suites = [name.strip() for name in args.suites.split(',') if name.strip()]
+    unknown = [name for name in suites if name not in SUITES]
+    if unknown:
+        parser.error('unknown suites: ' + ', '.join(unknown))
+
+    results = []
+    print('%-32s %10s %10s %12s %12s %10s' % ('suite', 'objects', 'seconds', 'us/object', 'bytes', 'io'))
+    for suite in suites:
+        function, default_sizes = SUITES[suite]
+        for size in [parse_count(size) for size in (args.sizes or default_sizes).split(',') if size.strip()]:
+            seconds, extra = function(size, args.seed, args.repeats)
+            results.append(dict(suite=suite, objects=size, seconds=seconds, **extra))
+            print('%-32s %10d %10.3f %12.2f %12s %10s' % (suite, size, seconds, seconds / size * 1e6,
+                                                           extra.get('bytes', ''), extra.get('io', '')))
+
+    if args.report:
+        report = {
+            'version': REPORT_VERSION,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'seed': args.seed,
+            'repeats': args.repeats,
+            'results': results
+        }
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# benchmark-recommendation-script.py
+# Benchmark harness for src/scripts/recommendation-script.py
+#
+# Usage:
+#   benchmark-recommendation-script.py                         Default sizes and modes
+#   benchmark-recommendation-script.py --sizes 1m:1m --modes stream,catalog
+#   benchmark-recommendation-script.py --report report.json    Save a machine-readable report
+#   benchmark-recommendation-script.py --baseline report.json  Flag regressions against a saved report
+#
+# Sizes are <channels>:<history rows> with k/m suffixes. Payloads come from a
+# seeded generator, so a report is comparable with any other report made
+# with the same seed and sizes.
+
+import sys
+import json
+import os
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import random
+import itertools
+from datetime import datetime, timezone
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'scripts',
+                           'recommendation-script.py')
+
+REPORT_VERSION = 1
+DEFAULT_SIZES = '1k:100,10k:10k,100k:100k'
+DEFAULT_MODES = 'full,ids,stream,catalog'
+
+CATEGORIES = ['News', 'Sports', 'Movies', 'Kids', 'Music', 'Documentary', 'Entertainment', 'Religious',
+              'Shopping', 'Weather', 'Cooking', 'Travel', 'Business', 'Science', 'Comedy', 'Series']
+LANGUAGES = ['English', 'Spanish', 'French', 'Arabic', 'German', 'Portuguese', 'Hindi', 'Turkish']
+COUNTRIES = ['US', 'UK', 'ES', 'FR', 'EG', 'DE', 'BR', 'IN', 'TR', 'CA']
+NAME_WORDS = ['One', 'Plus', 'World', 'Live', 'Prime', 'Max', 'Gold', 'Channel', 'TV', 'HD', 'Nation',
+              'City', 'Star', 'Zone', 'Classic', 'Central', 'International', 'Family', 'Action', 'Hits']
+
+# Each mode: extra script arguments, and whether it reads the catalog-only input
+MODES = {
+    'full': (['--backend', 'auto'], False),
+    'ids': (['--output', 'ids'], False),
+    'python': (['--backend', 'python'], False),
+    'numpy': (['--backend', 'numpy'], False),
+    'content': (['--output', 'ids'], False),
+    'stream': (['--stream'], False),
+    'catalog': (['--output', 'ids'], True),
+    'batch': (['--output', 'ids'], False)
+}
+
+# Channels precomputed by the batch mode
+BATCH_CHANNELS = 100
+
+
+def parse_count(text):
+    """Parse 100, 10k or 1m."""
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def parse_sizes(text):
+    sizes = []
+    for item in text.split(','):
+        if item.strip():
+            channels, _, history = item.partition(':')
+            sizes.append((item.strip(), parse_count(channels), parse_count(history or '0')))
+    return sizes
+
+
+def zipf_picker(generator, count, exponent=1.1):
+    """Return a function drawing 0..count-1 with a Zipf-like skew towards small values."""
+    cumulative = list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(count)))
+    population = range(count)
+    return lambda k=1: generator.choices(population, cum_weights=cumulative, k=k)
+
+
+def write_payload(directory, channel_count, history_count, seed, now):
+    """Write the benchmark inputs for one size; returns (paths, channel ids for batch).
+
+    Channels have skewed categories, about 5% duplicate ids, some missing
+    categories, and both `category` and M3U `group` fields. History mixes
+    raw view events and the JS engine's aggregated entries, skewed towards
+    popular channels. Files are written in chunks so that 1M-row payloads do
+    not need to fit in memory as one object.
+    """
+    generator = random.Random(seed)
+    pick_category = zipf_picker(generator, len(CATEGORIES))
+    pick_channel = zipf_picker(generator, min(channel_count, 100000), 0.9)
+
+    settings = {'maxRecommendations': 10}
+    content_settings = {'maxRecommendations': 10, 'recommendationFactors': {'content': 0.2}}
+
+    def channel(position):
+        if position > 0 and generator.random() < 0.05:
+            channel_id = f"ch-{generator.randrange(position)}"
+        else:
+            channel_id = f"ch-{position}"
+        words = generator.sample(NAME_WORDS, generator.randint(1, 3))
+        record = {
+            'id': channel_id,
+            'name': f"{' '.join(words)} {position}",
+            'url': f"http://example.invalid/stream/{position}.m3u8",
+            'logo': f"http://example.invalid/logo/{position}.png",
+            'attributes': {
+                'tvg-id': channel_id,
+                'tvg-language': generator.choice(LANGUAGES),
+                'tvg-country': generator.choice(COUNTRIES)
+            }
+        }
+        category = CATEGORIES[pick_category()[0]] if generator.random() > 0.1 else ''
+        record['category' if generator.random() < 0.5 else 'group'] = category
+        return record
+
+    def history_entry():
+        channel_id = f"ch-{pick_channel()[0]}"
+        timestamp = now - generator.randrange(60 * 86400)
+        if generator.random() < 0.5:
+            return {'channelId': channel_id, 'viewTimeSeconds': generator.randrange(30, 7200), 'timestamp': timestamp}
+        return {
+            'channelId': channel_id,
+            'totalViewTime': generator.randrange(30, 36000),
+            'viewCount': generator.randrange(1, 50),
+            'lastViewed': datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+        }
+
+    def write_array(f, items):
+        f.write('[')
+        for i, item in enumerate(items):
+            if i:
+                f.write(',')
+            f.write(json.dumps(item, separators=(',', ':')))
+        f.write(']')
+
+    # The catalog is written once and spliced into every input variant
+    channels_path = os.path.join(directory, 'channels.fragment')
+    with open(channels_path, 'w', encoding='utf-8') as f:
+        write_array(f, (channel(position) for position in range(channel_count)))
+
+    history = [history_entry() for _ in range(history_count)]
+    base = {
+        'history': history,
+        'currentChannel': 'ch-0',
+        'now': now,
+        'catalogChecksum': f"bench-{seed}-{channel_count}"
+    }
+
+    paths = {}
+    for name, variant_settings, with_channels in (
+        ('full', settings, True),
+        ('content', content_settings, True),
+        ('catalog', settings, False)
+    ):
+        paths[name] = os.path.join(directory, f"input-{name}.json")
+        with open(paths[name], 'w', encoding='utf-8') as f:
+            text = json.dumps({**base, 'settings': variant_settings}, separators=(',', ':'))
+            if not with_channels:
+                f.write(text)
+                continue
+            f.write(text[:-1] + ',"channels":')
+            with open(channels_path, 'r', encoding='utf-8') as fragment:
+                shutil.copyfileobj(fragment, f)
+            f.write('}')
+
+    os.remove(channels_path)
+    batch_ids = [f"ch-{position}" for position in range(min(channel_count, BATCH_CHANNELS))]
+    return paths, batch_ids
+
+
+def run_measured(args, output_path):
+    """Run the script once; returns (wall seconds, peak RSS in MB or None, exit code).
+
+    Peak RSS comes from wait4's per-child rusage, so it is reported as None
+    where there is no wait4 (Windows).
+    """
+    with open(output_path, 'wb') as out:
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, SCRIPT_PATH] + args, stdout=out, stderr=subprocess.DEVNULL)
+
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            wall = time.perf_counter() - started
+            process.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is KiB on Linux and bytes on macOS
+            divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+            return wall, round(usage.ru_maxrss / divisor, 1), process.returncode
+
+        code = process.wait()
+        return time.perf_counter() - started, None, code
+
+
+def check_output(output_path, mode):
+    """Return an error message if the run did not produce a usable result."""
+    try:
+        with open(output_path, 'r', encoding='utf-8') as f:
+            if mode == 'batch':
+                lines = f.read().splitlines()
+                return None if lines and 'summary' in json.loads(lines[-1]) else 'missing batch summary'
+            result = json.load(f)
+    except (OSError, ValueError) as e:
+        return f"unreadable output: {e}"
+    return result.get('error')
+
+
+def benchmark(sizes, modes, repeat, seed, work_dir):
+    results = []
+    now = 1760000000
+
+    for label, channel_count, history_count in sizes:
+        size_dir = os.path.join(work_dir, label.replace(':', '-'))
+        os.makedirs(size_dir, exist_ok=True)
+
+        started = time.perf_counter()
+        inputs, batch_ids = write_payload(size_dir, channel_count, history_count, seed, now)
+        print(f"[{label}] generated {os.path.getsize(inputs['full']) / 1e6:.1f} MB input "
+              f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        catalog_file = os.path.join(size_dir, 'catalog.bin')
+        output_path = os.path.join(size_dir, 'output.json')
+
+        for mode in modes:
+            extra, catalog_only = MODES[mode]
+            args = list(extra)
+            input_path = inputs['full']
+
+            if mode == 'content':
+                input_path = inputs['content']
+            elif mode == 'batch':
+                args += ['--batch', ','.join(batch_ids)]
+            elif catalog_only:
+                # Untimed run that writes the catalog, as the first run after a playlist change does
+                if os.path.exists(catalog_file):
+                    os.remove(catalog_file)
+                run_measured(args + ['--catalog', catalog_file, inputs['full']], output_path)
+                args += ['--catalog', catalog_file]
+                input_path = inputs['catalog']
+
+            runs = []
+            error = None
+            for _ in range(repeat):
+                wall, rss, code = run_measured(args + [input_path], output_path)
+                error = check_output(output_path, mode) or (f"exit code {code}" if code else None)
+                if error:
+                    break
+                runs.append({'wallSeconds': round(wall, 4), 'peakRssMB': rss})
+
+            entry = {
+                'size': label,
+                'channels': channel_count,
+                'history': history_count,
+                'mode': mode,
+                'ok': error is None,
+                'inputBytes': os.path.getsize(input_path),
+                'outputBytes': os.path.getsize(output_path),
+                'runs': runs
+            }
+            if error:
+                entry['error'] = error
+            if runs:
+                entry['wallSeconds'] = statistics.median(run['wallSeconds'] for run in runs)
+                rss = [run['peakRssMB'] for run in runs if run['peakRssMB'] is not None]
+                entry['peakRssMB'] = max(rss) if rss else None
+            results.append(entry)
+
+            if error:
+                print(f"[{label}] {mode:8} FAILED: {error}", file=sys.stderr)
+            else:
+                rss_text = f"{entry['peakRssMB']:.0f} MB" if entry['peakRssMB'] is not None else 'n/a'
+                print(f"[{label}] {mode:8} {entry['wallSeconds']:8.3f}s  peak RSS {rss_text:>8}  "
+                      f"output {entry['outputBytes']} B", file=sys.stderr)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return regression messages for results slower or larger than the baseline."""
+    previous = {(entry['size'], entry['mode']): entry for entry in baseline.get('results', [])}
+    regressions = []
+
+    for entry in results:
+        before = previous.get((entry['size'], entry['mode']))
+        if before is None:
+            continue
+        name = f"{entry['size']} {entry['mode']}"
+        if before.get('ok') and not entry['ok']:
+            regressions.append(f"{name}: now fails ({entry.get('error')})")
+            continue
+
+        for metric, unit in (('wallSeconds', 's'), ('peakRssMB', ' MB')):
+            old, new = before.get(metric), entry.get(metric)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {new:.3f}{unit} vs {old:.3f}{unit} "
+                                   f"(+{(new / old - 1) * 100:.0f}%)")
+
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the Python recommendation script')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated <channels>:<history> pairs')
+    parser.add_argument('--modes', default=DEFAULT_MODES, help=f"comma-separated modes from: {', '.join(MODES)}")
+    parser.add_argument('--repeat', type=int, default=3, help='runs per size and mode; the median is reported')
+    parser.add_argument('--seed', type=int, default=1, help='generator seed')
+    parser.add_argument('--report', help='write the JSON report here')
+    parser.add_argument('--baseline', help='saved report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='allowed slowdown or memory growth before flagging, as a fraction')
+    parser.add_argument('--work-dir', help='keep generated inputs here instead of a temporary directory')
+    args = parser.parse_args(argv[1:])
+
+    modes = [mode for mode in args.modes.split(',') if mode]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='recommendation-benchmark-')
+    try:
+        results = benchmark(parse_sizes(args.sizes), modes, max(1, args.repeat), args.seed, work_dir)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'version': REPORT_VERSION,
+        'createdAt': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': results
+    }
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('seed') != args.seed:
+            print(f"Baseline was made with seed {baseline.get('seed')}, not {args.seed}", file=sys.stderr)
+
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            return 1
+        print('No regressions against the baseline', file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -42,6 +42,11 @@ const TESTS = {
     script: 'test-settings.js',
     description: 'Tests configuration management'
   },
+  recommendations: {
+    name: 'Recommendation Script Tests',
+    script: 'test-recommendation-script.js',
+    description: 'Tests Python scorer parity across backends'
+  },
   ui: {
     name: 'UI Enhancement Tests',
     script: 'test-ui-enhancements.js',
@@ -0,0 +1,273 @@
+/**
+ * Test Recommendation Script
+ *
+ * This script checks that the Python recommendation scorer gives the same
+ * answers through each of its scoring paths (pure Python, NumPy, streaming,
+ * batch, binary catalog)
+ */
+
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { spawnSync, execSync } = require('child_process');
+
+// Paths
+const SCRIPT_PATH = path.join(__dirname, '..', 'src', 'scripts', 'recommendation-script.py');
+const LOG_FILE = path.join(__dirname, 'recommendation-script-test.log');
+
+// Ensure log file exists
+if (!fs.existsSync(LOG_FILE)) {
+  fs.writeFileSync(LOG_FILE, '', 'utf8');
+}
+
+/**
+ * Log test results
+ * @param {string} message - Message to log
+ * @param {string} level - Log level
+ */
+function log(message, level = 'info') {
+  const timestamp = new Date().toISOString();
+  const formatted = `[${timestamp}] [${level.toUpperCase()}] ${message}\n`;
+  fs.appendFileSync(LOG_FILE, formatted);
+  console.log(message);
+}
+
+/**
+ * Find a Python interpreter the same way the Python wrapper does
+ * @returns {string|null} Python command
+ */
+function findPython() {
+  for (const command of ['python3', 'python']) {
+    try {
+      execSync(`${command} --version`, { stdio: 'ignore' });
+      return command;
+    } catch (error) {
+      // Try the next candidate
+    }
+  }
+  return null;
+}
+
+/**
+ * Small deterministic PRNG so failures are reproducible
+ * @param {number} seed - Seed value
+ * @returns {Function} Generator returning floats in [0, 1)
+ */
+function seededRandom(seed) {
+  let state = seed >>> 0;
+  return () => {
+    state = (state * 1664525 + 1013904223) >>> 0;
+    return state / 4294967296;
+  };
+}
+
+/**
+ * Build a test payload with duplicate ids, missing categories and both history formats
+ * @param {number} seed - Seed value
+ * @returns {Object} Script input
+ */
+function buildPayload(seed) {
+  const random = seededRandom(seed);
+  const pick = (items) => items[Math.floor(random() * items.length)];
+  const now = 1760000000;
+
+  const channels = [];
+  const channelCount = 50 + Math.floor(random() * 200);
+  for (let i = 0; i < channelCount; i++) {
+    const channel = { id: `ch-${Math.floor(random() * channelCount)}`, name: `Channel ${i}` };
+    if (random() < 0.6) {
+      channel.category = pick(['News', 'sports', 'Movies', '', null]);
+    } else {
+      channel.group = pick(['News', 'Kids', 'Music']);
+    }
+    channels.push(channel);
+  }
+
+  const history = [];
+  const historyCount = Math.floor(random() * 40);
+  for (let i = 0; i < historyCount; i++) {
+    const channelId = `ch-${Math.floor(random() * (channelCount + 10))}`;
+    if (random() < 0.5) {
+      history.push({
+        channelId,
+        viewTimeSeconds: Math.floor(random() * 3600),
+        timestamp: now - Math.floor(random() * 30 * 86400)
+      });
+    } else {
+      history.push({
+        channelId,
+        totalViewTime: random() * 3600,
+        lastViewed: new Date((now - Math.floor(random() * 30 * 86400)) * 1000).toISOString()
+      });
+    }
+  }
+
+  return {
+    history,
+    channels,
+    currentChannel: pick(channels).id,
+    settings: { maxRecommendations: 1 + Math.floor(random() * 20) },
+    now
+  };
+}
+
+/**
+ * Run the script on a data file
+ * @param {string} python - Python command
+ * @param {string} dataFile - Input file
+ * @param {Array<string>} args - Extra arguments
+ * @returns {Object} Parsed result
+ */
+function runScript(python, dataFile, args) {
+  const result = spawnSync(python, [SCRIPT_PATH, ...args, dataFile], { encoding: 'utf8' });
+  return JSON.parse(result.stdout);
+}
+
+/**
+ * Reduce a result to comparable [id, score] pairs
+ * @param {Object} result - Script result
+ * @returns {Array} Pairs
+ */
+function rankings(result) {
+  return result.recommendations.map(rec => [rec.channel.id, rec.score]);
+}
+
+/**
+ * Assert two rankings agree on order and (within tolerance) on scores
+ * @param {Array} expected - Reference ranking
+ * @param {Array} actual - Ranking under test
+ * @param {string} label - Description for failures
+ */
+function assertSameRanking(expected, actual, label) {
+  assert.deepStrictEqual(actual.map(r => r[0]), expected.map(r => r[0]), `${label}: order differs`);
+  expected.forEach(([id, score], i) => {
+    assert(Math.abs(actual[i][1] - score) < 1e-9, `${label}: score for ${id} differs`);
+  });
+}
+
+/**
+ * Test Recommendation Script
+ */
+async function testRecommendationScript() {
+  log('=== Testing Python Recommendation Script ===');
+
+  const python = findPython();
+  if (!python) {
+    log('Python not found, skipping recommendation script tests ⚠️', 'warn');
+    return;
+  }
+
+  const dataFile = path.join(os.tmpdir(), `recommendation-script-test-${process.pid}.json`);
+
+  try {
+    // Test 1: Backend parity
+    log('\n1. Testing NumPy and pure-Python scoring parity');
+
+    let numpyAvailable = true;
+    for (let seed = 1; seed <= 25; seed++) {
+      fs.writeFileSync(dataFile, JSON.stringify(buildPayload(seed)), 'utf8');
+
+      const reference = runScript(python, dataFile, ['--backend', 'python']);
+      assert(!reference.error, `Python backend failed: ${reference.error}`);
+
+      if (numpyAvailable) {
+        const vectorized = runScript(python, dataFile, ['--backend', 'numpy']);
+        if (vectorized.error && vectorized.error.includes('NumPy is not installed')) {
+          numpyAvailable = false;
+        } else {
+          assert.strictEqual(vectorized.backend, 'numpy', 'Should report the NumPy backend');
+          assertSameRanking(rankings(reference), rankings(vectorized), `seed ${seed} numpy`);
+        }
+      }
+    }
+
+    if (numpyAvailable) {
+      log('Backend parity: PASSED ✅');
+    } else {
+      log('NumPy not installed, NumPy parity skipped ⚠️', 'warn');
+    }
+
+    // Test 2: Streaming parity
+    log('\n2. Testing streaming path against in-memory scoring');
+
+    for (let seed = 101; seed <= 125; seed++) {
+      fs.writeFileSync(dataFile, JSON.stringify(buildPayload(seed), null, 2), 'utf8');
+
+      const reference = runScript(python, dataFile, ['--backend', 'python']);
+      const streamed = runScript(python, dataFile, ['--stream']);
+      assertSameRanking(rankings(reference), rankings(streamed), `seed ${seed} stream`);
+    }
+
+    log('Streaming parity: PASSED ✅');
+
+    // Test 3: Batch parity
+    log('\n3. Testing batch precompute against single runs');
+
+    for (let seed = 201; seed <= 205; seed++) {
+      const payload = buildPayload(seed);
+      fs.writeFileSync(dataFile, JSON.stringify(payload), 'utf8');
+
+      const result = spawnSync(python, [SCRIPT_PATH, '--batch', 'all', '--jobs', '2', dataFile], { encoding: 'utf8' });
+      const lines = result.stdout.trim().split('\n').map(line => JSON.parse(line));
+      const summary = lines.pop().summary;
+      assert(summary, 'Batch output should end with a summary line');
+      assert.strictEqual(summary.channels, lines.length, 'Summary should count every channel');
+
+      for (const line of lines.slice(0, 10)) {
+        fs.writeFileSync(dataFile, JSON.stringify({ ...payload, currentChannel: line.currentChannel }), 'utf8');
+        const single = runScript(python, dataFile, ['--backend', 'python']);
+        assertSameRanking(rankings(single), rankings(line), `seed ${seed} batch ${line.currentChannel}`);
+      }
+    }
+
+    log('Batch parity: PASSED ✅');
+
+    // Test 4: Binary catalog
+    log('\n4. Testing binary catalog against JSON channels');
+
+    const catalogFile = path.join(os.tmpdir(), `recommendation-catalog-test-${process.pid}.bin`);
+    try {
+      for (let seed = 301; seed <= 310; seed++) {
+        const payload = buildPayload(seed);
+        const catalogChecksum = `seed-${seed}`;
+        fs.writeFileSync(dataFile, JSON.stringify(payload), 'utf8');
+        const reference = runScript(python, dataFile, ['--backend', 'python']);
+
+        // First run writes the catalog, the second reads it without channels
+        fs.writeFileSync(dataFile, JSON.stringify({ ...payload, catalogChecksum }), 'utf8');
+        const written = runScript(python, dataFile, ['--backend', 'python', '--catalog', catalogFile]);
+        const { channels, ...withoutChannels } = payload;
+        fs.writeFileSync(dataFile, JSON.stringify({ ...withoutChannels, catalogChecksum }), 'utf8');
+        const mapped = runScript(python, dataFile, ['--backend', 'python', '--catalog', catalogFile]);
+
+        assertSameRanking(rankings(reference), rankings(written), `seed ${seed} catalog write`);
+        assertSameRanking(rankings(reference), rankings(mapped), `seed ${seed} catalog read`);
+      }
+
+      fs.writeFileSync(dataFile, JSON.stringify({ history: [], catalogChecksum: 'changed' }), 'utf8');
+      const stale = runScript(python, dataFile, ['--catalog', catalogFile]);
+      assert.strictEqual(stale.staleCatalog, true, 'A checksum mismatch should report a stale catalog');
+    } finally {
+      if (fs.existsSync(catalogFile)) {
+        fs.unlinkSync(catalogFile);
+      }
+    }
+
+    log('Binary catalog: PASSED ✅');
+
+  } catch (error) {
+    log(`Test error: ${error.message}`, 'error');
+    console.error(error);
+    process.exitCode = 1;
+  } finally {
+    if (fs.existsSync(dataFile)) {
+      fs.unlinkSync(dataFile);
+    }
+  }
+
+  log('\n=== Recommendation Script Tests Complete ===');
+}
+
+// Run tests
+testRecommendationScript().catch(err => console.error('Test error:', err));